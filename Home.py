@@ -5,6 +5,7 @@ import importlib
 from streamlit.runtime.caching import cache_resource
 from db.db_helpers import get_connection
 import db.general_db_search as db_search
+import db.query_log as query_log
 import inspect
 import uuid
 import json
@@ -56,6 +57,29 @@ def get_chart_class(plot_type):
     except (ImportError, AttributeError):
         st.error(f"Chart type '{plot_type}' not supported")
         return None
+
+def show_query_debug(entries):
+    """Time, rows and query plan of the get_data calls of one plot"""
+    total_ms = sum(entry["ms"] for entry in entries)
+    slow = any(entry["slow"] for entry in entries)
+    with st.expander(f"{'⚠️ ' if slow else ''}Query debug: {len(entries)} queries, {total_ms:.1f} ms"):
+        for entry in entries:
+            st.write(f"**{entry['ms']} ms**, {entry['rows']} rows" + (" (result cache)" if entry["cached"] else ""))
+            for flag in entry["flags"]:
+                st.warning(flag)
+            if entry["sql"]:
+                st.code(entry["sql"], language="sql")
+                st.write("Params:", entry["params"])
+                st.code("\n".join(entry["plan"]))
+
+def show_slow_queries():
+    slow_queries = query_log.read_slow_log()
+    with st.expander(f"Slow queries (> {config.SLOW_QUERY_MS} ms): {len(slow_queries)}"):
+        for entry in slow_queries:
+            st.write(f"{entry['time']}: **{entry['ms']} ms**, {entry['rows']} rows, fields {', '.join(entry['spec']['fields'])}")
+            for flag in entry["flags"]:
+                st.warning(flag)
+            st.code(entry["sql"], language="sql")
     
 
 def show():
@@ -154,9 +178,15 @@ def show():
             **chart_args
         )
 
-        fig = chart_instance.render(get_data_func=db_search.get_data)
+        with query_log.capture() as entries:
+            fig = chart_instance.render(get_data_func=db_search.get_data)
         st.plotly_chart(fig, use_container_width=True, key=f"{uuid.uuid4()}")
+        if config.QUERY_LOG_ENABLED:
+            show_query_debug(entries)
 
+    st.caption(f"Query cache: {db_search.format_cache_stats()}")
+    if config.QUERY_LOG_ENABLED:
+        show_slow_queries()
 
     add_page_link, remove_last, rightspace = st.columns([0.15, 0.15, 0.7])
     with add_page_link:
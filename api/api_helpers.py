@@ -1,7 +1,13 @@
 import config
-import requests
+import api.http_client as http
+import json
+import threading
+import time
 
-def get_igdb_access_token():
+_token = None
+_token_lock = threading.Lock()
+
+def request_igdb_access_token():
     url = "https://id.twitch.tv/oauth2/token"
     params = {
         "client_id": config.IGDB_CLIENT_ID,
@@ -9,12 +15,68 @@ def get_igdb_access_token():
         "grant_type": "client_credentials"
     }
 
-    response = requests.post(url, params=params)
+    response = http.post(url, params=params)
     response.raise_for_status()
     print("got IGDB-access token")
-    return response.json()["access_token"]
+    data = response.json()
+    return {
+        "client_id": config.IGDB_CLIENT_ID,
+        "access_token": data["access_token"],
+        "expires_at": int(time.time()) + data["expires_in"]
+    }
+
+def load_cached_token():
+    try:
+        with open(config.TOKEN_CACHE_PATH, encoding="utf-8") as f:
+            token = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+    # a token of another client id is useless
+    if token.get("client_id") != config.IGDB_CLIENT_ID:
+        return None
+    return token
+
+def save_cached_token(token):
+    tmp_path = config.TOKEN_CACHE_PATH.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(token, f)
+    tmp_path.replace(config.TOKEN_CACHE_PATH)
+
+def is_token_valid(token):
+    return token is not None and token["expires_at"] - config.IGDB_TOKEN_REFRESH_MARGIN > time.time()
+
+def get_igdb_access_token(stale_token=None):
+    """
+    Returns a valid access token. Tokens are requested lazily, cached on disk and
+    renewed before they expire. Passing the token that was just rejected (401)
+    forces a renewal, unless another thread already renewed it.
+    """
+    global _token
+    with _token_lock:
+        if _token is None:
+            _token = load_cached_token()
+
+        if not is_token_valid(_token) or (stale_token and _token["access_token"] == stale_token):
+            _token = request_igdb_access_token()
+            save_cached_token(_token)
+
+        return _token["access_token"]
+
+def get_headers(access_token=None):
+    return {
+        "Client-ID": config.IGDB_CLIENT_ID,
+        "Authorization": f"Bearer {access_token or get_igdb_access_token()}"
+    }
+
+def post_igdb(url, body):
+    """POSTs an APIcalypse query; a rejected token is renewed and the request repeated once"""
+    access_token = get_igdb_access_token()
+    response = http.post(url, headers=get_headers(access_token), data=body)
+
+    if response.status_code == 401:
+        print("IGDB-access token rejected, requesting a new one")
+        access_token = get_igdb_access_token(stale_token=access_token)
+        response = http.post(url, headers=get_headers(access_token), data=body)
 
-HEADERS = {
-    "Client-ID": config.IGDB_CLIENT_ID,
-    "Authorization": f"Bearer {get_igdb_access_token()}"
-}
\ No newline at end of file
+    return response
@@ -1,9 +1,13 @@
 import config
 import api.api_helpers as helpers
-import requests
-from pathlib import Path
+from api.rate_limit import TokenBucket
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import csv
-import time
+import hashlib
+import json
+import queue
+import threading
 
 def load_id_set(filename):
     with open(filename, newline="", encoding="utf-8") as f:
@@ -12,49 +16,205 @@ def load_id_set(filename):
 def format_id_list(id_set):
     return ",".join(map(str, id_set))
 
-def fetch_game_data():
-    offset = 0
-    counter = 1
-    DATA_PATH = Path(__file__).resolve().parent.parent / "data"
-    blocked_keywords = load_id_set(Path(DATA_PATH) / "filtered_igdb_keywords.csv")
+def get_game_fields(mapping):
+    """IGDB fields of the import query, derived from the entries of the DB mapping"""
+    fields = []
+    for api_field, table, _ in mapping:
+        # expanded relations return their id anyway
+        if table != "games" and api_field.endswith(".id"):
+            continue
+        if api_field not in fields:
+            fields.append(api_field)
+    return ", ".join(fields)
+
+def build_game_query(mapping, filter_locally=config.IGDB_FILTER_LOCALLY):
+    """
+    Builds the fields (from the mapping entries) and filter conditions of the games
+    query (without paging).
+    With filter_locally only the game types are filtered by IGDB; platform, keyword
+    and rating filters are applied later by api.local_filter, so the downloaded
+    superset (and its raw cache) stays valid when the filter CSVs change.
+    """
+    if filter_locally:
+        return {
+            "fields": get_game_fields(mapping),
+            "where": "game_type = (0,4,6,8,9,11)"
+        }
+
+    blocked_keywords = load_id_set(config.BLOCKED_KEYWORDS_PATH)
     print(f"{len(blocked_keywords)} blocked keywords loaded.")
-    allowed_platforms = load_id_set(Path(DATA_PATH) / "filtered_igdb_platforms.csv")
+    allowed_platforms = load_id_set(config.ALLOWED_PLATFORMS_PATH)
     print(f"{len(allowed_platforms)} allowed platforms loaded")
 
     blocked_str = format_id_list(blocked_keywords)
     allowed_str = format_id_list(allowed_platforms)
-    
-    all_game_data = []
 
-    while True:
-        query = f'''
-        fields id, name, slug, summary, checksum, url, platforms.name, genres.name, themes.name, game_modes.name,
-                player_perspectives.name, game_engines.name, franchises.name, collections.name, keywords.name, language_supports.language.name, first_release_date,
-                cover.url, cover.image_id, aggregated_rating, aggregated_rating_count, rating, rating_count, total_rating;
-        where platforms = ({allowed_str}) 
+    return {
+        "fields": get_game_fields(mapping),
+        "where": f"""platforms = ({allowed_str})
                 & ((keywords = null) | (keywords != ({blocked_str})))
-                & ((rating_count > 5) | (aggregated_rating_count > 0))
-                & game_type = (0,4,6,8,9,11);
-        sort id asc;
-        limit {config.IGDB_LIMIT};
-        offset {offset};
-        '''
-        response = requests.post("https://api.igdb.com/v4/games", headers=helpers.HEADERS, data=query)
-
-        if response.status_code != 200:
-            print(f"Error: {response.status_code}, Offset: {offset}")
-            break
+                & ((rating_count > {config.MIN_RATING_COUNT}) | (aggregated_rating_count > {config.MIN_AGGREGATED_RATING_COUNT}))
+                & game_type = (0,4,6,8,9,11)"""
+    }
+
+def build_sync_query(query, since):
+    """Restricts the query to games updated on IGDB after the unix timestamp `since`"""
+    return {
+        "fields": query["fields"],
+        "where": f"{query['where']}\n                & updated_at > {since}"
+    }
+
+def build_page_query(query, after_id, until_id=None):
+    """Keyset pagination: the next page starts after the last seen id instead of an offset"""
+    where = f"{query['where']}\n                & id > {after_id}"
+    if until_id is not None:
+        where += f" & id <= {until_id}"
+    return f"fields {query['fields']};\nwhere {where};\nsort id asc;\nlimit {config.IGDB_LIMIT};\n"
+
+def post_query(url, body, limiter, context=""):
+    limiter.acquire()
+    response = helpers.post_igdb(f"{url}/games", body)
+
+    if response.status_code != 200:
+        print(f"Error: {response.status_code}{context}")
+        # fail loudly instead of continuing with a partial import
+        response.raise_for_status()
+
+    return response.json()
 
-        data = response.json()
+def fetch_page(url, query, after_id, limiter, until_id=None):
+    return post_query(url, build_page_query(query, after_id, until_id), limiter, f", after id: {after_id}")
+
+def fetch_max_id(url, query, limiter):
+    """Returns the highest game id matching the query (None if nothing matches)"""
+    data = post_query(url, f"fields id;\nwhere {query['where']};\nsort id desc;\nlimit 1;\n", limiter)
+    return data[0]["id"] if data else None
+
+def fetch_id_window(url, query, after_id, until_id, limiter):
+    """Fetches all pages of games with after_id < id <= until_id"""
+    pages = []
+    while True:
+        page = fetch_page(url, query, after_id, limiter, until_id)
+        if page:
+            pages.append(page)
+        if len(page) < config.IGDB_LIMIT:
+            return pages
+        after_id = page[-1]["id"]
+
+def iter_game_pages(query, after_id=0, url=None):
+    """Yields the filtered IGDB games with id > after_id page by page (max. IGDB_LIMIT games per page)"""
+    url = url or config.IGDB_API_URL
+    limiter = TokenBucket(config.IGDB_REQUESTS_PER_SECOND)
+    counter = 1
+    total = 0
+
+    while True:
+        data = fetch_page(url, query, after_id, limiter)
         if not data:
             print("No further games found")
             break
-        
-        all_game_data.extend(data)
-        print(f"Cycle {counter}: fetched {len(all_game_data)} games in total")
-        offset += config.IGDB_LIMIT
+
+        total += len(data)
+        print(f"Cycle {counter}: fetched {total} games in total")
+        yield data
+
+        after_id = data[-1]["id"]
         counter += 1
-        time.sleep(0.25)
 
-    return all_game_data
+def iter_game_pages_concurrent(query, after_id=0, url=None,
+                               requests_per_second=config.IGDB_REQUESTS_PER_SECOND,
+                               max_in_flight=config.IGDB_MAX_IN_FLIGHT):
+    """
+    Same pages as iter_game_pages, but the id range is split into windows of
+    IGDB_ID_WINDOW ids that are fetched in parallel (keyset-paged within each window).
+    Up to `max_in_flight` windows run at once, paced by a token bucket; pages are
+    yielded in id order.
+    """
+    url = url or config.IGDB_API_URL
+    limiter = TokenBucket(requests_per_second)
+    max_id = fetch_max_id(url, query, limiter)
+    if max_id is None or max_id <= after_id:
+        print("No further games found")
+        return
 
+    in_flight = deque()
+    next_start = after_id
+    counter = 1
+    total = 0
+
+    executor = ThreadPoolExecutor(max_workers=max_in_flight)
+
+    def submit():
+        nonlocal next_start
+        until_id = next_start + config.IGDB_ID_WINDOW
+        in_flight.append(executor.submit(fetch_id_window, url, query, next_start, until_id, limiter))
+        next_start = until_id
+
+    try:
+        while next_start < max_id and len(in_flight) < max_in_flight:
+            submit()
+
+        while in_flight:
+            for data in in_flight.popleft().result():
+                total += len(data)
+                print(f"Cycle {counter}: fetched {total} games in total")
+                yield data
+                counter += 1
+
+            if next_start < max_id:
+                submit()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def query_fingerprint(query):
+    return hashlib.sha1(json.dumps(query, sort_keys=True).encode("utf-8")).hexdigest()
+
+def load_checkpoint(query):
+    """Returns the last committed game id of an unfinished import with the same query (0 if none)"""
+    if not config.CHECKPOINT_PATH.exists():
+        return 0
+
+    with open(config.CHECKPOINT_PATH, encoding="utf-8") as f:
+        checkpoint = json.load(f)
+
+    if checkpoint.get("query") != query_fingerprint(query):
+        print("Checkpoint belongs to a different query and is ignored")
+        return 0
+    return checkpoint["last_id"]
+
+def save_checkpoint(query, last_id):
+    tmp_path = config.CHECKPOINT_PATH.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"query": query_fingerprint(query), "last_id": last_id}, f)
+    tmp_path.replace(config.CHECKPOINT_PATH)
+
+def clear_checkpoint():
+    config.CHECKPOINT_PATH.unlink(missing_ok=True)
+
+def prefetch_pages(pages, depth=config.IGDB_PREFETCH_PAGES):
+    """
+    Pulls pages from the given iterator in a background thread, so the next
+    request is already running while the current page is written to the DB.
+    At most `depth` pages are buffered.
+    """
+    buffer = queue.Queue(maxsize=depth)
+    done = object()
+
+    def producer():
+        try:
+            for page in pages:
+                buffer.put(page)
+        except Exception as e:
+            buffer.put(e)
+        finally:
+            buffer.put(done)
+
+    threading.Thread(target=producer, daemon=True).start()
+
+    while True:
+        item = buffer.get()
+        if item is done:
+            break
+        if isinstance(item, Exception):
+            raise item
+        yield item
@@ -0,0 +1,96 @@
+import config
+import requests
+from requests.adapters import HTTPAdapter
+from email.utils import parsedate_to_datetime
+import random
+import threading
+import time
+
+# 429 = IGDB rate limit, 5xx = temporary server errors
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+_session = None
+_session_lock = threading.Lock()
+
+_stats = {"requests": 0, "retries": 0, "bytes": 0, "wire_bytes": 0, "seconds": 0.0}
+_stats_lock = threading.Lock()
+
+def get_session():
+    """Shared keep-alive session for all API requests (one pooled connection per parallel request)"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=2, pool_maxsize=config.IGDB_MAX_IN_FLIGHT)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers["Accept-Encoding"] = "gzip, deflate"
+            _session = session
+        return _session
+
+def record(response, seconds, retry):
+    with _stats_lock:
+        _stats["requests"] += 1
+        _stats["retries"] += int(retry)
+        _stats["seconds"] += seconds
+        if response is not None:
+            _stats["bytes"] += len(response.content)
+            # Content-Length is the compressed size when the body was gzipped
+            _stats["wire_bytes"] += int(response.headers.get("Content-Length", len(response.content)))
+
+def get_stats():
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["avg_latency"] = stats["seconds"] / stats["requests"] if stats["requests"] else 0.0
+    return stats
+
+def format_stats():
+    stats = get_stats()
+    return (f"{stats['requests']} requests ({stats['retries']} retries), "
+            f"{stats['wire_bytes'] / 1e6:.1f} MB transferred ({stats['bytes'] / 1e6:.1f} MB uncompressed), "
+            f"avg latency {stats['avg_latency'] * 1000:.0f} ms")
+
+def parse_retry_after(value):
+    """Retry-After is either a number of seconds or an HTTP date"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def retry_delay(attempt, response=None):
+    """Exponential backoff with full jitter; a Retry-After header sets the minimum"""
+    delay = random.uniform(0, min(config.HTTP_BACKOFF_MAX, config.HTTP_BACKOFF_BASE * 2 ** attempt))
+    retry_after = parse_retry_after(response.headers.get("Retry-After")) if response is not None else None
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
+
+def post(url, **kwargs):
+    """POST via the shared session, retrying rate limits, server errors and dropped connections"""
+    for attempt in range(config.HTTP_MAX_RETRIES + 1):
+        retry = attempt > 0
+        start = time.perf_counter()
+        try:
+            response = get_session().post(url, timeout=config.HTTP_TIMEOUT, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            record(None, time.perf_counter() - start, retry)
+            if attempt == config.HTTP_MAX_RETRIES:
+                raise
+            delay = retry_delay(attempt)
+            print(f"Request failed ({type(e).__name__}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+            continue
+
+        record(response, time.perf_counter() - start, retry)
+        if response.status_code not in RETRY_STATUS_CODES or attempt == config.HTTP_MAX_RETRIES:
+            return response
+
+        delay = retry_delay(attempt, response)
+        print(f"HTTP {response.status_code}, retrying in {delay:.1f}s")
+        time.sleep(delay)
@@ -0,0 +1,44 @@
+import config
+from api.fetch_filtered_game_data import load_id_set
+
+def ids_of(entries):
+    # expanded relations come as {"id": ..., "name": ...}, plain ones as ids
+    return (entry["id"] if isinstance(entry, dict) else entry for entry in entries or ())
+
+def compile_game_filter():
+    """
+    Compiles the platform allow-list, keyword block-list and rating thresholds into
+    one predicate with the same semantics as the IGDB where clause of build_game_query.
+    The CSVs are read once; every check is a set lookup.
+    """
+    allowed_platforms = frozenset(load_id_set(config.ALLOWED_PLATFORMS_PATH))
+    blocked_keywords = frozenset(load_id_set(config.BLOCKED_KEYWORDS_PATH))
+    print(f"Local filter: {len(allowed_platforms)} allowed platforms, {len(blocked_keywords)} blocked keywords")
+
+    min_rating_count = config.MIN_RATING_COUNT
+    min_aggregated_rating_count = config.MIN_AGGREGATED_RATING_COUNT
+
+    def keep(game):
+        if not ((game.get("rating_count") or 0) > min_rating_count
+                or (game.get("aggregated_rating_count") or 0) > min_aggregated_rating_count):
+            return False
+        if allowed_platforms.isdisjoint(ids_of(game.get("platforms"))):
+            return False
+        return blocked_keywords.isdisjoint(ids_of(game.get("keywords")))
+
+    return keep
+
+def filter_pages(pages, keep=None):
+    """Applies the local filter to every page; pages without remaining games are skipped"""
+    keep = keep or compile_game_filter()
+    fetched = 0
+    kept = 0
+
+    for page in pages:
+        filtered = [game for game in page if keep(game)]
+        fetched += len(page)
+        kept += len(filtered)
+        if filtered:
+            yield filtered
+
+    print(f"Local filter kept {kept} of {fetched} games")
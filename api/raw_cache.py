@@ -0,0 +1,125 @@
+import config
+from api.fetch_filtered_game_data import query_fingerprint
+import gzip
+import json
+import shutil
+import time
+
+def get_cache_dir(query):
+    return config.RAW_CACHE_PATH / query_fingerprint(query)[:16]
+
+def page_path(cache_dir, cursor):
+    # zero padded, so the file names sort like the ids
+    return cache_dir / f"{cursor:010d}.jsonl.gz"
+
+def clear_cache(query):
+    shutil.rmtree(get_cache_dir(query), ignore_errors=True)
+
+def read_cache_info(cache_dir):
+    """query.json of a cache dir: the query, fetch_started (unix time) and complete; None if missing"""
+    try:
+        with open(cache_dir / "query.json", encoding="utf-8") as f:
+            info = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    # caches written before fetch_started/complete were recorded count as unfinished
+    return info if "query" in info else None
+
+def write_cache_info(cache_dir, info):
+    tmp_path = cache_dir / "query.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(info, f, indent=2)
+    tmp_path.replace(cache_dir / "query.json")
+
+def has_cache(query):
+    """True if an import of the query ran through and its pages are cached"""
+    cache_dir = get_cache_dir(query)
+    info = read_cache_info(cache_dir)
+    return info is not None and info["complete"] and any(cache_dir.glob("*.jsonl.gz"))
+
+def get_fetch_started(query):
+    """Unix time the cached import started fetching, the cached games are at least as fresh"""
+    return read_cache_info(get_cache_dir(query))["fetch_started"]
+
+def write_page(cache_dir, cursor, page):
+    tmp_path = cache_dir / f"{cursor:010d}.tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=5) as f:
+        for game in page:
+            f.write(json.dumps(game, separators=(",", ":")))
+            f.write("\n")
+    tmp_path.replace(page_path(cache_dir, cursor))
+
+def get_cursor(path):
+    return int(path.name.split(".")[0])
+
+def truncate_cache(cache_dir, after_id):
+    """
+    Drops the cached games with id > after_id: a resumed import fetches them again,
+    with other page boundaries (id windows, locally filtered checkpoints), so the
+    old files would be replayed as duplicates.
+    """
+    for path in cache_dir.glob("*.tmp"):
+        path.unlink()
+    for path in cache_dir.glob("*.jsonl.gz"):
+        if get_cursor(path) >= after_id:
+            path.unlink()
+            continue
+        page = read_page(path)
+        if page and page[-1]["id"] > after_id:
+            write_page(cache_dir, get_cursor(path), [game for game in page if game["id"] <= after_id])
+
+def cache_pages(query, pages, after_id=0):
+    """
+    Passes the pages through and stores every page as compressed JSONL, keyed by
+    its keyset cursor (the id the page starts after). A resumed import (after_id > 0)
+    first truncates the cache to the games up to after_id and keeps the original
+    fetch start. The cache is marked complete once all pages went through.
+    """
+    cache_dir = get_cache_dir(query)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    info = read_cache_info(cache_dir) if after_id else None
+    if after_id:
+        truncate_cache(cache_dir, after_id)
+    info = {
+        "query": query,
+        "fetch_started": info["fetch_started"] if info else int(time.time()),
+        "complete": False,
+    }
+    write_cache_info(cache_dir, info)
+
+    cursor = after_id
+    for page in pages:
+        write_page(cache_dir, cursor, page)
+        cursor = page[-1]["id"]
+        yield page
+
+    info["complete"] = True
+    write_cache_info(cache_dir, info)
+
+def find_cached_query(where, fields):
+    """A complete cached query with the same conditions whose pages contain all `fields`, or None"""
+    needed = {field.strip() for field in fields.split(",")}
+    for query_path in sorted(config.RAW_CACHE_PATH.glob("*/query.json")):
+        info = read_cache_info(query_path.parent)
+        if info is None:
+            continue
+        cached = info["query"]
+        cached_fields = {field.strip() for field in cached["fields"].split(",")}
+        if cached["where"] == where and needed <= cached_fields and has_cache(cached):
+            return cached
+    return None
+
+def list_cached_files(query):
+    cache_dir = get_cache_dir(query)
+    files = sorted(cache_dir.glob("*.jsonl.gz"))
+    print(f"Replaying {len(files)} cached pages from {cache_dir}")
+    return files
+
+def read_page(path):
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+def iter_cached_pages(query):
+    """Yields the cached raw pages of the query in id order"""
+    for path in list_cached_files(query):
+        yield read_page(path)
@@ -0,0 +1,39 @@
+"""
+Insert phase of setup_db.build_database with and without bulk-load mode.
+
+    python -m benchmarks.bench_bulk_load [game_count]
+"""
+import config
+import db.db_helpers as helpers
+import db.insert_data as insert
+import setup_db
+from benchmarks.synthetic import make_pages
+import contextlib
+import io
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+def timed_build(extracted_pages, mapping, bulk, db_path):
+    config.DB_PATH = db_path
+    config.BULK_LOAD = bulk
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        setup_db.build_database(iter(extracted_pages), mapping)
+    return time.perf_counter() - start
+
+if __name__ == "__main__":
+    game_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    mapping = helpers.load_mapping(config.DB_MAPPING_PATH)
+    extracted_pages = list(insert.extract_pages(make_pages(game_count), mapping))
+    link_count = sum(len(v) for _, data in extracted_pages for v in data["links"].values())
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config.PRESET_PATH = Path(tmp) / "presets"
+        default_time = timed_build(extracted_pages, mapping, False, Path(tmp) / "default.sqlite")
+        bulk_time = timed_build(extracted_pages, mapping, True, Path(tmp) / "bulk.sqlite")
+
+    print(f"{game_count} games, {link_count} link rows")
+    print(f"per-page commits, live keys: {default_time:6.2f}s")
+    print(f"bulk-load mode:              {bulk_time:6.2f}s ({default_time / bulk_time:.1f}x faster)")
@@ -0,0 +1,75 @@
+"""
+Result decoding on synthetic raw query results (no DB needed): the per-cell
+convert_from_unix loop of the old df=False path and the per-plot whitelist load plus
+pd.to_datetime of Chart.get_dataframe vs. decode_rows/decode_frame. decode_frame
+also builds the Int64 and categorical columns, its timing is the price of the typing,
+the memory line what it saves.
+
+    python -m benchmarks.bench_decode [rows]
+"""
+import db.general_db_search as db_search
+import json
+import config
+import random
+import sys
+import time
+import pandas as pd
+
+COLUMNS = ["games.name", "games.first_release_date", "games.rating", "genres.name"]
+AGGREGATION = {}
+
+def make_rows(row_count):
+    """Raw rows like SQLite returns them: unix seconds, a few NULLs, repeated genre names"""
+    rng = random.Random(7)
+    rows = []
+    for i in range(row_count):
+        rows.append({
+            "games.name": f"game {i}",
+            "games.first_release_date": None if i % 50 == 0 else rng.randint(631152000, 1735689600),
+            "games.rating": None if i % 20 == 0 else rng.uniform(10, 100),
+            "genres.name": f"genres {rng.randint(0, 22)}",
+        })
+    return rows
+
+def old_rows(rows):
+    datetime_columns = ["games.first_release_date"]
+    for row in rows:
+        for column in datetime_columns:
+            row[column] = db_search.convert_from_unix(row[column])
+    return rows
+
+def old_frame(df):
+    with open(config.QUERY_WHITELIST_PATH, "r", encoding="utf-8") as f:
+        whitelist = json.load(f)
+    datetime_fields = {field for field, entry in whitelist.items() if entry["type"] == "datetime"}
+    for col in df.columns:
+        if col in datetime_fields or f"games.{col}" in datetime_fields:
+            df[col] = pd.to_datetime(df[col], unit='s')
+    return df
+
+def best_time(function, make_input, repeat=5):
+    best = None
+    for _ in range(repeat):
+        data = make_input()
+        start = time.perf_counter()
+        result = function(data)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+if __name__ == "__main__":
+    row_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    rows = make_rows(row_count)
+    frame = pd.DataFrame(rows, columns=COLUMNS)
+    # compile the catalog outside of the timings, it is shared by all calls
+    db_search.get_column_type("games.name", AGGREGATION)
+
+    print(f"{row_count} rows")
+    before, _ = best_time(old_rows, lambda: [dict(row) for row in rows])
+    after, _ = best_time(lambda data: db_search.decode_rows(data, AGGREGATION), lambda: [dict(row) for row in rows])
+    print(f"{'rows (df=False)':20} {before * 1000:8.1f}ms -> {after * 1000:8.1f}ms ({before / after:.1f}x)")
+
+    before, old = best_time(old_frame, frame.copy)
+    after, new = best_time(lambda data: db_search.decode_frame(data, AGGREGATION), frame.copy)
+    print(f"{'DataFrame':20} {before * 1000:8.1f}ms -> {after * 1000:8.1f}ms ({before / after:.1f}x)")
+    print(f"{'memory':20} {old.memory_usage(deep=True).sum() / 1e6:8.1f}MB -> {new.memory_usage(deep=True).sum() / 1e6:6.1f}MB")
@@ -0,0 +1,82 @@
+"""
+Per-game extraction cost of the compiled accessor plan vs. the previous
+string-splitting/recursive implementation.
+
+    python -m benchmarks.bench_extract [game_count]
+"""
+import config
+import db.db_helpers as helpers
+import db.insert_data as insert
+from benchmarks.synthetic import make_pages
+import sys
+import time
+
+def legacy_extract_insert_data(games_data, mapping):
+    """extract_insert_data before the accessor plan (kept as baseline)"""
+    game_inserts = []
+    ref_inserts = {}
+    link_inserts = {}
+
+    def find_id_name_recursive(data):
+        results = []
+        if isinstance(data, dict):
+            if "id" in data and "name" in data:
+                results.append((data["id"], data["name"]))
+            else:
+                for value in data.values():
+                    results.extend(find_id_name_recursive(value))
+        elif isinstance(data, list):
+            for item in data:
+                results.extend(find_id_name_recursive(item))
+        return results
+
+    for game_data in games_data:
+        game_entry = {"id": game_data["id"]}
+
+        for api_field, table, column in mapping:
+            data = game_data
+            for part in api_field.split("."):
+                if isinstance(data, dict) and part in data:
+                    data = data[part]
+                elif isinstance(data, list):
+                    break
+                else:
+                    data = None
+                    break
+
+            if data is None:
+                continue
+
+            if table == "games":
+                game_entry[column] = data
+            else:
+                for sub_id, sub_name in find_id_name_recursive(data):
+                    ref_inserts.setdefault(table, set()).add((sub_id, sub_name))
+                    link_inserts.setdefault(f"games_{table}", set()).add((game_data["id"], sub_id))
+
+        game_inserts.append(game_entry)
+
+    return game_inserts, ref_inserts, link_inserts
+
+def best_of(func, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+if __name__ == "__main__":
+    game_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    mapping = helpers.load_mapping(config.DB_MAPPING_PATH)
+    pages = make_pages(game_count)
+
+    legacy_time, legacy = best_of(lambda: [legacy_extract_insert_data(page, mapping) for page in pages])
+    plan = insert.compile_mapping(mapping)
+    plan_time, compiled = best_of(lambda: [insert.extract_insert_data(page, mapping, plan) for page in pages])
+
+    assert legacy == compiled, "accessor plan extracts different rows"
+
+    print(f"{game_count} games, {len(mapping)} mapping entries")
+    print(f"legacy:        {legacy_time * 1e6 / game_count:7.1f} µs/game")
+    print(f"accessor plan: {plan_time * 1e6 / game_count:7.1f} µs/game ({legacy_time / plan_time:.1f}x faster)")
@@ -0,0 +1,129 @@
+"""
+The IGDB fetchers against a local stand-in server (http.server) with a fixed
+latency per request: iter_game_pages vs. iter_game_pages_concurrent. Checks that
+both return every game once and in id order, that the concurrent requests stay in
+their id windows and under the in-flight cap, and that the requests are paced at
+the rate limit.
+
+    python -m benchmarks.bench_fetch [game_count] [latency_ms] [requests_per_second]
+"""
+import config
+import api.fetch_filtered_game_data as data
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+QUERY = {"fields": "id, name", "where": "game_type = (0,4,6,8,9,11)"}
+
+def start_stub_server(ids, latency):
+    """
+    Answers the games queries of the fetchers (id > / id <= bounds, sort id asc/desc,
+    limit) from `ids`; returns (url, server, requests). Every request is logged as
+    (start, end, after_id, until_id).
+    """
+    ids = sorted(ids)
+    requests = []
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            start = time.monotonic()
+            body = self.rfile.read(int(self.headers["Content-Length"])).decode("utf-8")
+            time.sleep(latency)
+
+            after = re.search(r"id > (\d+)", body)
+            until = re.search(r"id <= (\d+)", body)
+            after_id = int(after.group(1)) if after else None
+            until_id = int(until.group(1)) if until else None
+            limit = int(re.search(r"limit (\d+)", body).group(1))
+
+            selected = [i for i in ids if (after_id is None or i > after_id) and (until_id is None or i <= until_id)]
+            if "sort id desc" in body:
+                selected.reverse()
+            payload = json.dumps([{"id": i, "name": f"Game {i}"} for i in selected[:limit]]).encode("utf-8")
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+            with lock:
+                requests.append((start, time.monotonic(), after_id, until_id))
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}", server, requests
+
+def check_pages(pages, ids):
+    fetched = [game["id"] for page in pages for game in page]
+    assert fetched == sorted(ids), "games missing, duplicated or out of id order"
+
+def check_pacing(requests, requests_per_second):
+    # token bucket with capacity 1: request n starts n / rate seconds after the first at the earliest
+    starts = sorted(start for start, _, _, _ in requests)
+    for n, start in enumerate(starts):
+        assert start - starts[0] >= n / requests_per_second - 0.05, f"request {n} came too early"
+
+def check_windows(requests, max_in_flight):
+    for _, _, after_id, until_id in requests:
+        if until_id is None:
+            # the max id lookup
+            continue
+        # the fetch starts at id 0, so the windows end at multiples of IGDB_ID_WINDOW
+        assert until_id % config.IGDB_ID_WINDOW == 0 and after_id < until_id, "request outside of its id window"
+    events = sorted([(start, 1) for start, _, _, _ in requests] + [(end, -1) for _, end, _, _ in requests])
+    open_requests = peak = 0
+    for _, change in events:
+        open_requests += change
+        peak = max(peak, open_requests)
+    assert peak <= max_in_flight, f"{peak} requests in flight"
+    return peak
+
+def timed(fetch):
+    start = time.perf_counter()
+    pages = list(fetch())
+    return time.perf_counter() - start, pages
+
+if __name__ == "__main__":
+    game_count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    latency = (int(sys.argv[2]) if len(sys.argv) > 2 else 300) / 1000
+    requests_per_second = float(sys.argv[3]) if len(sys.argv) > 3 else config.IGDB_REQUESTS_PER_SECOND
+    ids = random.Random(0).sample(range(1, game_count * 5), game_count)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # a cached token, the stand-in server doesn't check it
+        config.TOKEN_CACHE_PATH = Path(tmp) / "token.json"
+        with open(config.TOKEN_CACHE_PATH, "w", encoding="utf-8") as f:
+            json.dump({"client_id": config.IGDB_CLIENT_ID, "access_token": "stub",
+                       "expires_at": int(time.time()) + 10 * config.IGDB_TOKEN_REFRESH_MARGIN}, f)
+        config.IGDB_REQUESTS_PER_SECOND = requests_per_second
+
+        print(f"{game_count} games, {latency * 1000:.0f} ms latency, {requests_per_second} requests/s")
+        results = {}
+        for label, fetch in [("serial", data.iter_game_pages), ("concurrent", data.iter_game_pages_concurrent)]:
+            url, server, requests = start_stub_server(ids, latency)
+            if label == "serial":
+                seconds, pages = timed(lambda: fetch(QUERY, url=url))
+            else:
+                seconds, pages = timed(lambda: fetch(QUERY, url=url, requests_per_second=requests_per_second))
+            server.shutdown()
+
+            check_pages(pages, ids)
+            check_pacing(requests, requests_per_second)
+            peak = check_windows(requests, config.IGDB_MAX_IN_FLIGHT)
+            results[label] = (seconds, len(requests), peak)
+
+    for label, (seconds, request_count, peak) in results.items():
+        print(f"{label:12} {seconds:6.2f}s {request_count:4} requests ({request_count / seconds:.1f}/s), "
+              f"max. {peak} in flight")
@@ -0,0 +1,43 @@
+"""
+Replay of a raw page dump (decode + extract) in one process vs. the process pool
+of insert.extract_pages_parallel.
+
+    python -m benchmarks.bench_parallel_replay [game_count] [workers]
+"""
+import config
+import api.raw_cache as raw_cache
+import db.db_helpers as helpers
+import db.insert_data as insert
+from benchmarks.synthetic import make_pages
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+def timed(func):
+    start = time.perf_counter()
+    games = sum(len(games_data["games"]) for _, games_data in func())
+    return time.perf_counter() - start, games
+
+if __name__ == "__main__":
+    game_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else config.EXTRACT_WORKERS
+    mapping = helpers.load_mapping(config.DB_MAPPING_PATH)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_dir = Path(tmp)
+        for page in make_pages(game_count):
+            raw_cache.write_page(cache_dir, page[0]["id"], page)
+        files = sorted(cache_dir.glob("*.jsonl.gz"))
+
+        serial_time, serial_games = timed(
+            lambda: insert.extract_pages((raw_cache.read_page(path) for path in files), mapping)
+        )
+        parallel_time, parallel_games = timed(
+            lambda: insert.extract_pages_parallel(files, mapping, read_page=raw_cache.read_page, workers=workers)
+        )
+
+    assert serial_games == parallel_games == game_count
+    print(f"{game_count} games in {len(files)} cached pages")
+    print(f"1 process:            {serial_time:6.2f}s")
+    print(f"{workers:2d} worker processes:  {parallel_time:6.2f}s (speedup {serial_time / parallel_time:.1f}x)")
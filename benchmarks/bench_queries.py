@@ -0,0 +1,98 @@
+"""
+Typical get_data shapes of the plots with and without the secondary indexes of
+db/indexes.py, on a synthetic games.sqlite.
+
+    python -m benchmarks.bench_queries [game_count]
+"""
+import config
+import db.db_helpers as helpers
+import db.general_db_search as db_search
+import db.indexes as indexes
+import db.insert_data as insert
+import setup_db
+from benchmarks.synthetic import make_pages
+import contextlib
+import io
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+QUERY_SHAPES = {
+    "games per genre": dict(
+        fields=["genres.name"],
+        aggregation={"game_count": {"field": "games.name", "function": "COUNT"}},
+        group_by=["genres.name"],
+    ),
+    "genre filter, top rated": dict(
+        fields=["games.name", "games.rating"],
+        filters=[{"field": "genres.name", "op": "=", "value": "genres 7"}],
+        sort_fields=[{"field": "games.rating", "direction": "DESC"}],
+        limit=50,
+    ),
+    "keyword filter": dict(
+        fields=["games.name", "games.first_release_date"],
+        filters=[{"field": "keywords.name", "op": "=", "value": "keywords 42"}],
+    ),
+    "release date range": dict(
+        fields=["games.name", "games.first_release_date"],
+        filters=[{"field": "games.first_release_date", "op": "BETWEEN", "value": [datetime(2015, 1, 1), datetime(2015, 3, 31)]}],
+    ),
+    "rating threshold": dict(
+        fields=["games.name", "games.total_rating"],
+        filters=[{"field": "games.total_rating", "op": ">", "value": 99.5}],
+    ),
+    "avg rating per platform": dict(
+        fields=["platforms.name"],
+        aggregation={"avg_rating": {"field": "games.rating", "function": "AVG"}},
+        group_by=["platforms.name"],
+        filters=[{"field": "themes.name", "op": "=", "value": "themes 3"}],
+    ),
+}
+
+def time_shapes(conn, repeat=3):
+    timings = {}
+    for label, shape in QUERY_SHAPES.items():
+        best = None
+        for _ in range(repeat):
+            # get_data converts datetime filter values in place
+            args = {key: [dict(v) for v in value] if key == "filters" else value for key, value in shape.items()}
+            start = time.perf_counter()
+            db_search.get_data(conn, cache=False, **args)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        timings[label] = best
+    return timings
+
+def set_indexes(conn, enabled):
+    cursor = conn.cursor()
+    if enabled:
+        indexes.create_indexes(cursor)
+    else:
+        indexes.drop_indexes(cursor)
+    cursor.execute("ANALYZE")
+    conn.commit()
+
+if __name__ == "__main__":
+    game_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    mapping = helpers.load_mapping(config.DB_MAPPING_PATH)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config.DB_PATH = Path(tmp) / "games.sqlite"
+        config.PRESET_PATH = Path(tmp) / "presets"
+        with contextlib.redirect_stdout(io.StringIO()):
+            setup_db.build_database(insert.extract_pages(make_pages(game_count), mapping), mapping)
+
+        conn = helpers.get_connection()
+        with contextlib.redirect_stdout(io.StringIO()):
+            set_indexes(conn, False)
+            before = time_shapes(conn)
+            set_indexes(conn, True)
+            after = time_shapes(conn)
+        conn.close()
+
+    print(f"{game_count} games")
+    print(f"{'query shape':28} {'no indexes':>11} {'indexes':>9}")
+    for label in QUERY_SHAPES:
+        print(f"{label:28} {before[label] * 1000:9.1f}ms {after[label] * 1000:7.1f}ms ({before[label] / after[label]:.1f}x)")
@@ -0,0 +1,127 @@
+"""
+Multi-relation get_data specs: the relation planner of build_query (semi-joins for
+filters, correlated subqueries for selected relations) vs. joining every relation
+and collapsing the rows with GROUP BY games.id, on a synthetic games.sqlite.
+The joined counts of the aggregated specs are inflated by the multiplied rows, the
+timings only compare the work.
+
+    python -m benchmarks.bench_relations [game_count]
+"""
+import config
+import db.db_helpers as helpers
+import db.general_db_search as db_search
+import db.insert_data as insert
+import setup_db
+from benchmarks.synthetic import make_pages
+import contextlib
+import io
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+RELATION_SPECS = {
+    "platforms + genres + keywords": dict(
+        fields=["games.name", "platforms.name", "genres.name", "keywords.name"],
+        filters=[{"field": "games.total_rating", "op": ">", "value": 90.0}],
+    ),
+    "two relation filters": dict(
+        fields=["games.name", "games.rating"],
+        filters=[
+            {"field": "genres.name", "op": "=", "value": "genres 7"},
+            {"field": "keywords.name", "op": "LIKE", "value": "keywords 1%"},
+        ],
+        sort_fields=[{"field": "games.rating", "direction": "DESC"}],
+        limit=50,
+    ),
+    "games per genre, filtered": dict(
+        fields=["genres.name"],
+        aggregation={"game_count": {"field": "games.name", "function": "COUNT"}},
+        group_by=["genres.name"],
+        filters=[
+            {"field": "platforms.name", "op": "LIKE", "value": "platforms 1%"},
+            {"field": "keywords.name", "op": "LIKE", "value": "keywords 2%"},
+        ],
+    ),
+    "platforms per theme": dict(
+        fields=["themes.name"],
+        aggregation={"platform_count": {"field": "platforms.name", "function": "COUNT"}},
+        group_by=["themes.name"],
+    ),
+}
+
+def get_relations(spec):
+    fields = (
+        set(spec["fields"])
+        | {f["field"] for f in spec.get("filters", [])}
+        | {agg["field"] for agg in spec.get("aggregation", {}).values()}
+    )
+    return {db_search.get_relation(field) for field in fields} - {None}
+
+def join_all_query(spec):
+    """Every relation joined into the game rows; returns (query, params, rows before grouping)"""
+    group_tables = {db_search.get_relation(g) for g in spec.get("group_by", [])}
+    joined = (get_relations(spec) | group_tables) - {None}
+    filter_tables = {db_search.get_relation(f["field"]) for f in spec.get("filters", [])}
+    join_lines = db_search.build_join_clause(joined, filter_tables)
+    where_clauses, params = db_search.build_where_clause(spec.get("filters", []), joined)
+    group_by = spec.get("group_by", [])
+
+    select_lines = []
+    for field in group_by + [field for field in spec["fields"] if field not in group_by]:
+        expression = db_search.field_expression(field, joined)
+        if db_search.get_relation(field) and field not in group_by:
+            # the values of one game are spread over the joined rows
+            expression = f"GROUP_CONCAT(DISTINCT {expression})"
+        select_lines.append(f"{expression} AS \"{field}\"")
+    for alias, agg in spec.get("aggregation", {}).items():
+        select_lines.append(f"{db_search.build_aggregate(agg['function'], agg['field'], joined)} AS {alias}")
+
+    body = f"""
+    FROM games
+    {" ".join(join_lines)}
+    {"WHERE " + " AND ".join(where_clauses) if where_clauses else ""}
+    """
+    query = f"""
+    SELECT {", ".join(select_lines)}
+    {body}
+    GROUP BY {", ".join(db_search.field_expression(g, joined) for g in group_by) if group_by else "games.id"}
+    {db_search.build_order_by_clause(spec.get("sort_fields"), joined)}
+    {f"LIMIT {spec['limit']}" if spec.get("limit") else ""}
+    """
+    return query, params, f"SELECT COUNT(*) {body}"
+
+def best_time(conn, query, params, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        conn.execute(query, params).fetchall()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+if __name__ == "__main__":
+    game_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    mapping = helpers.load_mapping(config.DB_MAPPING_PATH)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config.DB_PATH = Path(tmp) / "games.sqlite"
+        config.PRESET_PATH = Path(tmp) / "presets"
+        with contextlib.redirect_stdout(io.StringIO()):
+            setup_db.build_database(insert.extract_pages(make_pages(game_count), mapping), mapping)
+
+        conn = helpers.get_connection()
+        print(f"{game_count} games")
+        print(f"{'spec':32} {'joined rows':>11} {'join all':>10} {'planner':>9}")
+        for label, spec in RELATION_SPECS.items():
+            join_query, join_params, count_query = join_all_query(spec)
+            joined_rows = conn.execute(count_query, join_params).fetchone()[0]
+
+            planned_query, planned_params = db_search.build_query(
+                spec["fields"], spec.get("sort_fields", []), spec.get("filters", []), spec.get("aggregation", {}),
+                spec.get("group_by", []), [], spec.get("limit"), 0
+            )
+            before = best_time(conn, join_query, join_params)
+            after = best_time(conn, planned_query, planned_params)
+            print(f"{label:32} {joined_rows:11} {before * 1000:8.1f}ms {after * 1000:7.1f}ms ({before / after:.1f}x)")
+        conn.close()
@@ -0,0 +1,53 @@
+import random
+
+# relation -> (number of distinct entries, max. entries per game)
+RELATIONS = {
+    "platforms": (40, 4),
+    "genres": (23, 3),
+    "themes": (22, 3),
+    "keywords": (5000, 15),
+    "game_modes": (6, 3),
+    "player_perspectives": (7, 2),
+    "game_engines": (300, 1),
+    "franchises": (1500, 1),
+    "collections": (3000, 1),
+}
+LANGUAGES = 30
+
+def make_game(game_id, rng):
+    """One game in the shape IGDB returns for the import query"""
+    game = {
+        "id": game_id,
+        "name": f"Game {game_id}",
+        "slug": f"game-{game_id}",
+        "summary": "An adventure about " + " ".join(rng.choice(["dragons", "space", "cars", "cats", "wizards"]) for _ in range(20)),
+        "checksum": f"{rng.getrandbits(128):032x}",
+        "url": f"https://www.igdb.com/games/game-{game_id}",
+        "first_release_date": rng.randint(315532800, 1735689600),
+        "cover": {"id": game_id, "url": f"//images.igdb.com/t_thumb/co{game_id:x}.jpg", "image_id": f"co{game_id:x}"},
+        "rating": rng.uniform(20, 100),
+        "rating_count": rng.randint(0, 500),
+        "total_rating": rng.uniform(20, 100),
+    }
+    if rng.random() < 0.4:
+        game["aggregated_rating"] = rng.uniform(20, 100)
+        game["aggregated_rating_count"] = rng.randint(1, 30)
+
+    for relation, (size, per_game) in RELATIONS.items():
+        ids = {rng.randint(1, size) for _ in range(rng.randint(0, per_game))}
+        if ids:
+            game[relation] = [{"id": i, "name": f"{relation} {i}"} for i in sorted(ids)]
+
+    languages = {rng.randint(1, LANGUAGES) for _ in range(rng.randint(0, 4))}
+    if languages:
+        game["language_supports"] = [
+            {"id": game_id * 10 + n, "language": {"id": lang, "name": f"Language {lang}"}}
+            for n, lang in enumerate(sorted(languages))
+        ]
+    return game
+
+def make_pages(game_count, page_size=500, seed=0):
+    """Synthetic raw pages with ascending ids"""
+    rng = random.Random(seed)
+    ids = sorted(rng.sample(range(1, game_count * 5), game_count))
+    return [[make_game(game_id, rng) for game_id in ids[i:i + page_size]] for i in range(0, game_count, page_size)]
@@ -1,4 +1,5 @@
 from pathlib import Path
+import os
 import igdb_api_config
 
 if __name__ == "__main__":
@@ -8,10 +9,51 @@ if __name__ == "__main__":
 IGDB_CLIENT_ID = igdb_api_config.IGDB_CLIENT_ID
 IGDB_CLIENT_SECRET = igdb_api_config.IGDB_CLIENT_SECRET
 IGDB_LIMIT = 500  # IGDB-Maximum pro Anfrage
+IGDB_PREFETCH_PAGES = 2  # pages buffered ahead while the DB writes
+IGDB_API_URL = "https://api.igdb.com/v4"
+IGDB_TOKEN_REFRESH_MARGIN = 24 * 60 * 60  # renew the access token one day before it expires
+IGDB_REQUESTS_PER_SECOND = 4  # IGDB rate limit
+IGDB_MAX_IN_FLIGHT = 8  # IGDB limit for open requests
+IGDB_CONCURRENT_FETCH = True  # fetch several pages in parallel during setup
+IGDB_ID_WINDOW = 5000  # id range per parallel fetch task
+IGDB_FILTER_LOCALLY = False  # fetch all games once, apply platform/keyword/rating filters locally
+MIN_RATING_COUNT = 5  # games need more user ratings ...
+MIN_AGGREGATED_RATING_COUNT = 0  # ... or more critic ratings than this
+
+# HTTP
+HTTP_TIMEOUT = 60  # seconds
+HTTP_MAX_RETRIES = 6
+HTTP_BACKOFF_BASE = 1  # seconds, doubled per retry
+HTTP_BACKOFF_MAX = 60  # seconds
 
 DATA_PATH = Path(__file__).resolve().parent / "data"
 DB_MAPPING_PATH =  DATA_PATH / "db_games_map.json"
 DB_PATH = DATA_PATH / "games.sqlite"
+SQLITE_CACHE_KB = 64_000  # page cache per connection
+SQLITE_BULK_CACHE_KB = 512_000  # page cache while setup_db builds the DB
+SQLITE_STATEMENT_CACHE = 256  # prepared statements kept per connection
+SQLITE_PAGE_SIZE = 4096  # page size optimize_db.py rebuilds the DB with (8k/16k showed no gain for the plot queries)
+BULK_LOAD = True  # build new DBs in bulk-load mode
+BULK_COMMIT_PAGES = 20  # pages per transaction in bulk-load mode
+EXTRACT_WORKERS = max(1, (os.cpu_count() or 1) - 1)  # processes for extracting replayed pages
+EXTRACT_SHARD_PAGES = 4  # raw pages per extraction task
+CHECKPOINT_PATH = DATA_PATH / "import_checkpoint.json"
+TOKEN_CACHE_PATH = DATA_PATH / "igdb_token.json"
+BLOCKED_KEYWORDS_PATH = DATA_PATH / "filtered_igdb_keywords.csv"
+ALLOWED_PLATFORMS_PATH = DATA_PATH / "filtered_igdb_platforms.csv"
+RAW_CACHE_PATH = DATA_PATH / "raw_cache"
+RAW_CACHE_ENABLED = True  # keep the raw IGDB pages for offline rebuilds
+
+EXPORT_PATH = DATA_PATH / "export"
+EXPORT_FORMATS = ("csv", "parquet")  # Parquet requires pyarrow
+EXPORT_ROW_GROUP_SIZE = 100_000  # rows buffered per Parquet row group
+USE_AGGREGATE_TABLES = True  # answer per-relation aggregations from the agg_* summary tables
+QUERY_CACHE_MB = 128  # memory for get_data results shared by all app sessions, 0 = no cache
+QUERY_PLAN_CACHE_SIZE = 512  # compiled get_data queries kept per query shape
+QUERY_CHUNK_ROWS = 50_000  # rows fetched per chunk by get_data/iter_data
+QUERY_LOG_ENABLED = False  # time + EXPLAIN QUERY PLAN of every get_data call, debug panel under each plot
+SLOW_QUERY_MS = 250  # get_data calls slower than this are appended to SLOW_QUERY_LOG_PATH
+SLOW_QUERY_LOG_PATH = DATA_PATH / "slow_queries.jsonl"
 
 QUERY_WHITELIST_PATH = DATA_PATH / "db_query_whitelist.json"
 
@@ -0,0 +1,118 @@
+import config
+import db.catalog as catalog
+import json
+
+NUMERIC_TYPES = ("integer", "float", "datetime")
+
+def load_aggregate_spec(mapping_path=None):
+    """Relations and games columns (name -> type) the summary tables are built for"""
+    with open(mapping_path or config.DB_MAPPING_PATH, encoding="utf-8") as f:
+        games_table = json.load(f)["tables"]["games"]
+
+    relations = [rel["target_table"] for rel in games_table.get("relations", {}).values()]
+    columns = {column: data["type"] for column, data in games_table["fields"].items()}
+    return relations, columns
+
+def summary_columns(columns):
+    """SELECT lines of one summary table: COUNT for every games column, SUM/MIN/MAX for numeric ones"""
+    lines = ["COUNT(games.id) AS game_count"]
+    for column, type_name in columns.items():
+        if column == "id":
+            continue
+        lines.append(f"COUNT(games.{column}) AS {column}_count")
+        if type_name in NUMERIC_TYPES:
+            lines.append(f"SUM(games.{column}) AS {column}_sum")
+            lines.append(f"MIN(games.{column}) AS {column}_min")
+            lines.append(f"MAX(games.{column}) AS {column}_max")
+    return lines
+
+def has_aggregates(cursor):
+    return cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name LIKE 'agg_%'").fetchone() is not None
+
+def refresh_aggregates(cursor, mapping_path=None):
+    """
+    Rebuilds agg_<relation>: one row per reference name (NULL = games without an entry)
+    with the aggregates get_data would compute for "GROUP BY <relation>.name". Has to
+    run after every write to games or the link tables.
+    """
+    relations, columns = load_aggregate_spec(mapping_path)
+    select_lines = ",\n        ".join(summary_columns(columns))
+
+    for table in relations:
+        cursor.execute(f"DROP TABLE IF EXISTS agg_{table}")
+        cursor.execute(f"""
+        CREATE TABLE agg_{table} AS
+        SELECT {table}.name AS name,
+            {select_lines}
+        FROM games
+        LEFT JOIN games_{table} ON games.id = games_{table}.game_id
+        LEFT JOIN {table} ON games_{table}.{table}_id = {table}.id
+        GROUP BY {table}.name
+        """)
+    print(f"Refreshed {len(relations)} summary tables")
+
+def aggregate_expression(function, field, columns):
+    """SQL over the summary columns for FUNCTION(field), None if it can't be answered from them"""
+    table, _, column = field.partition(".")
+    if table != "games" or column not in columns:
+        return None
+
+    function = function.upper()
+    if function == "COUNT":
+        return "game_count" if column == "id" else f"{column}_count"
+    if columns[column] not in NUMERIC_TYPES or column == "id":
+        return None
+    if function == "AVG":
+        # division by zero is NULL in SQLite, like AVG over no values
+        return f"CAST({column}_sum AS REAL) / {column}_count"
+    if function in ("SUM", "MIN", "MAX"):
+        return f"{column}_{function.lower()}"
+    return None
+
+def route_query(conn, fields, filters, aggregation, group_by, having, sort_fields, limit, offset):
+    """
+    Returns (query, params) answering the get_data spec from a summary table, or None
+    if the spec doesn't fit: exactly one "<relation>.name" group, aggregations over
+    games columns, no WHERE filters and only group/aggregation fields selected.
+    """
+    if not config.USE_AGGREGATE_TABLES or filters or len(group_by) != 1 or not aggregation:
+        return None
+
+    group_field = group_by[0]
+    table, _, column = group_field.partition(".")
+    compiled = catalog.get_catalog()
+    relations, columns = compiled["relations"], compiled["games_columns"]
+    if table not in relations or column != "name":
+        return None
+    if any(field != group_field and field not in aggregation for field in fields):
+        return None
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (f"agg_{table}",)).fetchone():
+        return None
+
+    select_lines = [f"name AS \"{group_field}\""]
+    for alias, agg in aggregation.items():
+        expression = aggregate_expression(agg["function"], agg["field"], columns)
+        if expression is None:
+            return None
+        select_lines.append(f"{expression} AS {alias}")
+
+    order_parts = []
+    for sort_field in sort_fields:
+        if sort_field["field"] != group_field and sort_field["field"] not in aggregation:
+            return None
+        order_parts.append(f"\"{sort_field['field']}\" {'ASC' if sort_field['direction'] == 'ASC' else 'DESC'}")
+
+    where_clauses = [f"{condition['aggregation']} {condition['op']} ?" for condition in having]
+    params = [condition["value"] for condition in having]
+
+    query = f"""
+    SELECT * FROM (
+        SELECT {", ".join(select_lines)}
+        FROM agg_{table}
+    )
+    {"WHERE " + " AND ".join(where_clauses) if where_clauses else ""}
+    ORDER BY {", ".join(order_parts) if order_parts else f'"{group_field}"'}
+    {f"LIMIT {'?' if limit else -1}{' OFFSET ?' if offset else ''}" if limit or offset else ""}
+    """
+    params.extend(value for value in (limit, offset) if value)
+    return query, params
@@ -0,0 +1,72 @@
+import config
+import db.db_helpers as helpers
+import json
+import threading
+
+_catalog = None
+_catalog_stamp = None
+_catalog_lock = threading.Lock()
+
+def get_file_stamp():
+    paths = (config.QUERY_WHITELIST_PATH, config.DB_MAPPING_PATH)
+    return tuple((str(path), path.stat().st_mtime_ns) for path in paths)
+
+def resolve_field(field, mapping_columns):
+    """Whitelist field -> (table, column) of the DB, e.g. "cover.url" -> ("games", "cover_url")"""
+    api_field = field[len("games."):] if field.startswith("games.") else field
+    if api_field in mapping_columns:
+        return mapping_columns[api_field]
+    table, _, column = field.rpartition(".")
+    return table, column
+
+def compile_catalog(whitelist_path=None, mapping_path=None):
+    """
+    Compiles the query whitelist and the DB mapping into lookup tables:
+        whitelist     - the whitelist as in the file (field -> entry, file order for the UI)
+        fields        - field -> type, operators (set), webname, table, column
+        webnames      - webname -> field
+        mapping       - the (api_field, table, column) list of load_mapping
+        relations     - reference tables linked to games
+        games_columns - games column -> mapping type
+    """
+    with open(whitelist_path or config.QUERY_WHITELIST_PATH, "r", encoding="utf-8") as f:
+        whitelist = json.load(f)
+    mapping_path = mapping_path or config.DB_MAPPING_PATH
+    with open(mapping_path, encoding="utf-8") as f:
+        games_table = json.load(f)["tables"]["games"]
+    mapping = helpers.load_mapping(mapping_path)
+
+    mapping_columns = {api_field: (table, column) for api_field, table, column in mapping}
+
+    fields = {}
+    for field, entry in whitelist.items():
+        table, column = resolve_field(field, mapping_columns)
+        fields[field] = {
+            "type": entry["type"],
+            "operators": set(entry["operators"]),
+            "webname": entry.get("webname", field),
+            "table": table,
+            "column": column,
+        }
+
+    return {
+        "whitelist": whitelist,
+        "fields": fields,
+        "webnames": {entry["webname"]: field for field, entry in fields.items()},
+        "mapping": mapping,
+        "relations": [rel["target_table"] for rel in games_table.get("relations", {}).values()],
+        "games_columns": {column: data["type"] for column, data in games_table["fields"].items()},
+    }
+
+def get_catalog():
+    """
+    The compiled catalog, shared by all callers and rebuilt when the whitelist or the
+    mapping file changes. Read-only: callers must not modify the returned structures.
+    """
+    global _catalog, _catalog_stamp
+    stamp = get_file_stamp()
+    with _catalog_lock:
+        if _catalog is None or stamp != _catalog_stamp:
+            _catalog = compile_catalog()
+            _catalog_stamp = stamp
+        return _catalog
@@ -2,12 +2,29 @@ import sqlite3
 import json
 import config
 
-def get_connection(row = True):
-    conn = sqlite3.connect(config.DB_PATH, check_same_thread=False)
+def get_connection(row = True, bulk = False):
+    conn = sqlite3.connect(config.DB_PATH, check_same_thread=False, cached_statements=config.SQLITE_STATEMENT_CACHE)
     if row:
         conn.row_factory = sqlite3.Row
+    apply_pragmas(conn, bulk)
     return conn
 
+def apply_pragmas(conn, bulk = False):
+    """
+    WAL lets the app read while setup_db writes. The bulk-load settings skip the
+    fsyncs and use a large page cache: if only the import process dies the DB stays
+    intact, but an OS crash or power loss can corrupt it. Bulk mode is therefore only
+    used to build a new DB, which can simply be built again.
+    """
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    if bulk:
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.execute(f"PRAGMA cache_size = -{config.SQLITE_BULK_CACHE_KB}")
+    else:
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute(f"PRAGMA cache_size = -{config.SQLITE_CACHE_KB}")
+
 def generate_whitelist_from_mapping(mapping_path, output_path):
     with open(mapping_path, encoding="utf-8") as f:
         mapping = json.load(f)
@@ -63,6 +80,28 @@ def load_mapping(mapping_path):
 
     return mapping_list
 
+def get_meta(cursor, key, default=None):
+    row = cursor.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else default
+
+def set_meta(cursor, key, value):
+    cursor.execute(
+        "INSERT INTO meta (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+        (key, str(value))
+    )
+
+def bump_generation(cursor):
+    """Marks the DB content as changed, cached query results of the app become invalid"""
+    cursor.execute(
+        "INSERT INTO meta (key, value) VALUES ('generation', 1) "
+        "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+    )
+
 def close_connection(conn):
     conn.commit()
-    conn.close()
\ No newline at end of file
+    conn.close()
+
+def delete_database():
+    """Deletes games.sqlite with its WAL and shared-memory files, a new DB must not see the old WAL"""
+    for suffix in ("", "-wal", "-shm"):
+        config.DB_PATH.with_name(config.DB_PATH.name + suffix).unlink(missing_ok=True)
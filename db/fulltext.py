@@ -0,0 +1,57 @@
+# whitelist field -> column of games_fts
+FTS_COLUMNS = {
+    "games.name": "name",
+    "games.summary": "summary",
+    "keywords.name": "keywords"
+}
+
+def has_fts(cursor):
+    return cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'games_fts'").fetchone() is not None
+
+def rebuild_fts(cursor):
+    """
+    (Re)builds the FTS5 index over game names, summaries and keyword names. The table
+    is contentless (content=''): it only stores the index, the text stays in games.
+    """
+    cursor.execute("DROP TABLE IF EXISTS games_fts")
+    cursor.execute("""
+    CREATE VIRTUAL TABLE games_fts USING fts5(
+        name, summary, keywords,
+        content = '',
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """)
+    # hits in the name weigh more than keyword hits, summary hits the least
+    cursor.execute("INSERT INTO games_fts (games_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0, 3.0)')")
+    cursor.execute("""
+    INSERT INTO games_fts (rowid, name, summary, keywords)
+    SELECT games.id, games.name, games.summary, (
+        SELECT GROUP_CONCAT(keywords.name, ' ')
+        FROM games_keywords JOIN keywords ON keywords.id = games_keywords.keywords_id
+        WHERE games_keywords.game_id = games.id
+    )
+    FROM games
+    """)
+
+def to_fts_query(text):
+    """User input -> FTS5 query: every word has to occur, a trailing * matches word prefixes"""
+    terms = []
+    for word in str(text).split():
+        prefix = word.endswith("*")
+        # quoted, so FTS5 syntax in the input (AND, -, :, ...) is searched literally
+        word = word.rstrip("*").replace('"', '""')
+        if word:
+            terms.append(f'"{word}"*' if prefix else f'"{word}"')
+
+    if not terms:
+        raise ValueError("Full-text search needs at least one word")
+    return " ".join(terms)
+
+def build_match_query(match_filters):
+    """Combines the MATCH filters into one FTS5 query with column filters"""
+    parts = []
+    for f in match_filters:
+        if f["field"] not in FTS_COLUMNS:
+            raise ValueError(f"Field '{f['field']}' has no full-text index")
+        parts.append(f"{FTS_COLUMNS[f['field']]} : ({to_fts_query(f['value'])})")
+    return " AND ".join(parts)
@@ -1,9 +1,19 @@
 import db.db_helpers as helpers
+import db.fulltext as fulltext
+import db.aggregates as aggregates
+import db.catalog as catalog
+import db.query_log as query_log
 import json
 import builtins
 import config
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
 from typing import TypedDict, Literal, Union, Optional
 import pandas as pd
+import numpy as np
 from datetime import datetime
 
 def convert_to_unix(date_input):
@@ -67,185 +77,282 @@ def validate_get_data_input(
     having: Optional[Having] = None,
     offset: Optional[int] = None
 ) -> None:
+    validate_query_structure(fields, sort_fields, filters, aggregation, group_by, having)
+    validate_query_values(filters, having, limit, offset)
+
+def validate_query_structure(
+    fields: list[str],
+    sort_fields: Optional[list[dict[str, str]]],
+    filters: Filters,
+    aggregation: Optional[Aggregation] = None,
+    group_by: Optional[GroupBy] = None,
+    having: Optional[Having] = None
+) -> None:
+    """Checks everything but the values: fields, operators, functions, directions"""
     if not fields:
         raise ValueError("Field is missing")
 
     if fields == ["*"]:
         raise ValueError("Wildcard not allowed")
 
-    with open(config.QUERY_WHITELIST_PATH, "r", encoding="utf-8") as f:
-        whitelist = json.load(f)
-        allowed_fields = set(whitelist)
+    whitelist = catalog.get_catalog()["fields"]
+    allowed_fields = whitelist
+
+    for field in fields:
+        # Skip validation for aggregation fields like "AVG(games.rating)"
+        if is_aggregation_field(field):
+            continue
 
-        for field in fields:
-            # Skip validation for aggregation fields like "AVG(games.rating)"
+        # Skip if field is an aggregation alias
+        if aggregation and field in aggregation:
+            continue
+
+        if field not in allowed_fields:
+            raise ValueError(f"Field '{field}' not allowed")
+
+        
+    if sort_fields:
+        for sort_field in sort_fields:
+            field = sort_field["field"]
+            # Skip validation for aggregation fields in sort
             if is_aggregation_field(field):
                 continue
+                
+            if field not in allowed_fields:
+                raise ValueError(f"Sort-field '{field}' not allowed")
+            if sort_field["direction"] not in ["ASC", "DESC"]:
+                raise ValueError(f"Sort-direction {sort_field['direction']} not allowed")
 
-            # Skip if field is an aggregation alias
-            if aggregation and field in aggregation:
-                continue
+    if filters:
+        for f in filters:
+            field = f["field"]
+            op = f["op"]
 
+            # Skip validation for aggregation fields in filters
+            if is_aggregation_field(field):
+                continue
+                
             if field not in allowed_fields:
-                raise ValueError(f"Field '{field}' not allowed")
-
-            
-        if sort_fields:
-            for sort_field in sort_fields:
-                field = sort_field["field"]
-                # Skip validation for aggregation fields in sort
-                if is_aggregation_field(field):
-                    continue
-                    
-                if field not in allowed_fields:
-                    raise ValueError(f"Sort-field '{field}' not allowed")
-                if sort_field["direction"] not in ["ASC", "DESC"]:
-                    raise ValueError(f"Sort-direction {sort_field['direction']} not allowed")
-
-        if filters:
-            for f in filters:
-                field = f["field"]
-                op = f["op"]
-                value = f["value"]
-
-                # Skip validation for aggregation fields in filters
-                if is_aggregation_field(field):
-                    continue
-                    
-                if field not in allowed_fields:
-                    raise ValueError(f"Filter field '{field}' not allowed")
-
-                allowed_ops = whitelist[field]["operators"]
-                type_name = whitelist[field]["type"]
-
-                if op not in allowed_ops:
-                    raise ValueError(f"Operator '{op}' not allowed for '{field}'")
+                raise ValueError(f"Filter field '{field}' not allowed")
+
+            allowed_ops = whitelist[field]["operators"]
+            type_name = whitelist[field]["type"]
 
+            if op not in allowed_ops:
+                raise ValueError(f"Operator '{op}' not allowed for '{field}'")
+
+            if type_name != "datetime" and not isinstance(getattr(builtins, type_name, None), type):
+                raise ValueError(f"Unsupported type '{type_name}' in whitelist")
+
+    if aggregation:
+        for alias, agg_def in aggregation.items():
+            # Skip validation if field is an aggregation expression
+            if is_aggregation_field(agg_def["field"]):
+                continue
+                
+            if agg_def["field"] not in allowed_fields:
+                raise ValueError(f"Aggregation field '{agg_def['field']}' not allowed")
+            if agg_def["function"].upper() not in ("SUM", "AVG", "COUNT", "MIN", "MAX"):
+                raise ValueError(f"Aggregation function '{agg_def['function']}' not supported")
+
+    if group_by:
+        for g in group_by:
+            # Skip validation for aggregation fields in group_by
+            if is_aggregation_field(g):
+                continue
+                
+            if g not in allowed_fields:
+                raise ValueError(f"Group by field '{g}' not allowed")
+
+    if having:
+        for condition in having:
+            aggregation_alias = condition["aggregation"]  # Direkter Zugriff auf 'aggregation'
+            op = condition["op"]
+
+            if not aggregation or aggregation_alias not in aggregation:
+                raise ValueError(f"HAVING aggregation '{aggregation_alias}' must match an aggregation alias")
+            if op not in ("=", "!=", "<", "<=", ">", ">="):
+                raise ValueError(f"HAVING operator '{op}' not supported")
+
+def validate_query_values(
+    filters: Filters,
+    having: Optional[Having] = None,
+    limit: Optional[int] = None,
+    offset: Optional[int] = None
+) -> None:
+    """
+    Checks the values of a structurally valid spec and converts datetime filter
+    values to unix timestamps (in place)
+    """
+    whitelist = catalog.get_catalog()["fields"]
+
+    if filters:
+        for f in filters:
+            field = f["field"]
+            op = f["op"]
+            value = f["value"]
+
+            if is_aggregation_field(field):
+                continue
+
+            type_name = whitelist[field]["type"]
+            if type_name == "datetime":
+                expected_type = datetime
+            else:
+                expected_type = getattr(builtins, type_name)
+
+            if type_name == 'datetime':
                 try:
-                    if type_name == "datetime":
-                        expected_type = datetime
+                    if op in ("BETWEEN", "IN"):
+                        f["value"] = [convert_to_unix(v) for v in value]
                     else:
-                        expected_type = getattr(builtins, type_name)
-                except AttributeError:
-                    raise ValueError(f"Unsupported type '{type_name}' in whitelist")
-
-                if type_name == 'datetime':
-                    try:
-                        if op in ("BETWEEN", "IN"):
-                            f["value"] = [convert_to_unix(v) for v in value]
-                        else:
-                            f["value"] = convert_to_unix(value)
-                    except Exception as e:
-                        raise ValueError(f"Invalid date format for field '{field}': {str(e)}")
-
-                if op in ("BETWEEN", "IN"):
-                    if not isinstance(value, (list, tuple)):
-                        raise ValueError(f"Operator '{op}' requires a list or tuple")
-                    if not all(isinstance(v, expected_type) for v in value):
-                        raise ValueError(f"All values for '{field}' must be of type '{type_name}'")
-                else:
-                    if not isinstance(value, expected_type):
-                        raise ValueError(f"Value for '{field}' must be of type '{type_name}'")
-
-        if aggregation:
-            for alias, agg_def in aggregation.items():
-                # Skip validation if field is an aggregation expression
-                if is_aggregation_field(agg_def["field"]):
-                    continue
-                    
-                if agg_def["field"] not in allowed_fields:
-                    raise ValueError(f"Aggregation field '{agg_def['field']}' not allowed")
-                if agg_def["function"].upper() not in ("SUM", "AVG", "COUNT", "MIN", "MAX"):
-                    raise ValueError(f"Aggregation function '{agg_def['function']}' not supported")
-
-        if group_by:
-            for g in group_by:
-                # Skip validation for aggregation fields in group_by
-                if is_aggregation_field(g):
-                    continue
-                    
-                if g not in allowed_fields:
-                    raise ValueError(f"Group by field '{g}' not allowed")
-
-        if having:
-            for condition in having:
-                aggregation_alias = condition["aggregation"]  # Direkter Zugriff auf 'aggregation'
-                op = condition["op"]
-                val = condition["value"]
-
-                if aggregation_alias not in aggregation:
-                    raise ValueError(f"HAVING aggregation '{aggregation_alias}' must match an aggregation alias")
-                if op not in ("=", "!=", "<", "<=", ">", ">="):
-                    raise ValueError(f"HAVING operator '{op}' not supported")
-                if not isinstance(val, (int, float)):
-                    raise ValueError("HAVING values must be numeric")
-
-        if limit is not None and (not isinstance(limit, int) or limit <= 0):
-            raise ValueError("Limit must be a positive integer")
-
-        if offset is not None and (not isinstance(offset, int) or offset < 0):
-            raise ValueError("Offset must be a non-negative integer")
-
-def build_select_clause(fields: list[str], aggregation: Optional[Aggregation], group_by: Optional[GroupBy] = None) -> list[str]:
+                        f["value"] = convert_to_unix(value)
+                except Exception as e:
+                    raise ValueError(f"Invalid date format for field '{field}': {str(e)}")
+
+            if op in ("BETWEEN", "IN"):
+                if not isinstance(value, (list, tuple)):
+                    raise ValueError(f"Operator '{op}' requires a list or tuple")
+                if not all(isinstance(v, expected_type) for v in value):
+                    raise ValueError(f"All values for '{field}' must be of type '{type_name}'")
+            else:
+                if not isinstance(value, expected_type):
+                    raise ValueError(f"Value for '{field}' must be of type '{type_name}'")
+
+    if having:
+        for condition in having:
+            if not isinstance(condition["value"], (int, float)):
+                raise ValueError("HAVING values must be numeric")
+
+    if limit is not None and (not isinstance(limit, int) or limit <= 0):
+        raise ValueError("Limit must be a positive integer")
+
+    if offset is not None and (not isinstance(offset, int) or offset < 0):
+        raise ValueError("Offset must be a non-negative integer")
+
+# relation filters that select few reference rows via the name index
+SEMI_JOIN_INDEX_OPS = ("=", "IN")
+
+def get_relation(field: str) -> Optional[str]:
+    """Reference table of a relation field, None for games columns, aliases and expressions"""
+    info = catalog.get_catalog()["fields"].get(field)
+    if info is None or info["table"] == "games":
+        return None
+    return info["table"]
+
+def relation_subquery(field: str, function: str) -> str:
+    """Correlated subquery applying function (e.g. "MAX({})") to the relation values of the current game"""
+    info = catalog.get_catalog()["fields"][field]
+    table = info["table"]
+    value = function.format(f"{table}.{info['column']}")
+    return (
+        f"(SELECT {value} FROM games_{table} "
+        f"JOIN {table} ON {table}.id = games_{table}.{table}_id "
+        f"WHERE games_{table}.game_id = games.id)"
+    )
+
+def field_expression(field: str, joined: set[str]) -> str:
+    """
+    SQL for a whitelist field: games columns directly, joined relations by their
+    column, all other relations as comma-separated list of the game's values
+    """
+    info = catalog.get_catalog()["fields"].get(field)
+    if info is None:
+        # aggregation alias or expression like "AVG(games.rating)"
+        return field
+    if info["table"] == "games" or info["table"] in joined:
+        return f"{info['table']}.{info['column']}"
+    # the link-table key allows every reference only once per game
+    return relation_subquery(field, "GROUP_CONCAT({})")
+
+def build_aggregate(function: str, field: str, joined: set[str]) -> str:
+    function = function.upper()
+    table = get_relation(field)
+    if table is None or table in joined:
+        return f"{function}({field_expression(field, joined)})"
+
+    # aggregated per game first, so the relation doesn't multiply the game rows
+    if function == "AVG":
+        return f"CAST(SUM({relation_subquery(field, 'SUM({})')}) AS REAL) / SUM({relation_subquery(field, 'COUNT({})')})"
+    outer = "SUM" if function == "COUNT" else function
+    return f"{outer}({relation_subquery(field, function + '({})')})"
+
+def build_select_clause(fields: list[str], aggregation: Optional[Aggregation], group_by: Optional[GroupBy] = None, joined: Optional[set[str]] = None) -> list[str]:
     select_lines = []
+    joined = joined or set()
     
     # Handle regular fields (excluding any that are in group_by to avoid duplicates)
     if fields == ["*"]:
         select_lines.append("*")
     else:
-        # Only add fields that aren't in group_by (added automatically)
+        # group-by fields come first, the remaining fields aren't repeated
         group_by_set = set(str(g) for g in group_by) if group_by else set()
+        select_lines.extend(f"{field_expression(g, joined)} AS \"{g}\"" for g in group_by or [] if not is_aggregation_field(g))
         select_lines.extend(
-            f"{field} AS \"{field}\"" for field in fields if field not in group_by_set
+            f"{field_expression(field, joined)} AS \"{field}\"" for field in fields if field not in group_by_set
         )
     
     # Handle aggregations
     if aggregation:
         for alias, agg in aggregation.items():
-            field = agg['field']
-            select_lines.append(f"{agg['function'].upper()}({field}) as {alias}")
+            select_lines.append(f"{build_aggregate(agg['function'], agg['field'], joined)} as {alias}")
     
     return select_lines
 
-def build_join_clause(used_fields: set[str], field_table_map: dict[str, str]) -> tuple[list[str], list[str]]:
-    join_fields = {
-        f for f in used_fields 
-        if field_table_map.get(f) != "games" 
-        and not f.startswith("games.")
-    }
+def build_join_clause(joined: set[str], filter_tables: Optional[set[str]] = None) -> list[str]:
+    filter_tables = filter_tables or set()
     join_lines = []
-    additional_selects = []
 
-    for join in join_fields:
-        join_base = join.replace(".name", "")
+    for table in sorted(joined):
+        # a WHERE condition on the relation drops the NULL rows of a LEFT JOIN anyway;
+        # as inner join SQLite may start at the reference table and use the reverse index
+        join_type = "JOIN" if table in filter_tables else "LEFT JOIN"
         join_lines.append(
-            f"LEFT JOIN games_{join_base} ON games.id = games_{join_base}.game_id\n"
-            f"LEFT JOIN {join_base} ON games_{join_base}.{join_base}_id = {join_base}.id"
+            f"{join_type} games_{table} ON games.id = games_{table}.game_id\n"
+            f"{join_type} {table} ON games_{table}.{table}_id = {table}.id"
         )
-        if f"{join_base}.name" not in used_fields:
-            additional_selects.append(f"GROUP_CONCAT(DISTINCT {join_base}.name) AS \"{join_base}.name\"")
 
-    return join_lines, additional_selects
+    return join_lines
+
+def build_condition(column: str, op: str, val) -> tuple[str, list]:
+    if op == "BETWEEN":
+        return f"{column} BETWEEN ? AND ?", list(val)
+    if op == "IN":
+        placeholders = ", ".join(["?"] * len(val))
+        return f"{column} IN ({placeholders})", list(val)
+    return f"{column} {op} ?", [val]
 
-def build_where_clause(filters: Filters) -> tuple[list[str], list[Union[str, int, float]]]:
+def build_where_clause(filters: Filters, joined: Optional[set[str]] = None) -> tuple[list[str], list[Union[str, int, float]]]:
     where_clauses = []
     params = []
+    joined = joined or set()
+
+    # one semi-join collects the matching game ids up front (preferably one that uses the
+    # name index), the others are checked per remaining game via the link-table key
+    semi_joins = [f for f in filters if get_relation(f["field"]) not in joined | {None}]
+    driving = next((f for f in semi_joins if f["op"] in SEMI_JOIN_INDEX_OPS), semi_joins[0] if semi_joins else None)
 
     for f in filters:
-        field = f["field"]
-        op = f["op"]
-        val = f["value"]
-
-        if op == "BETWEEN":
-            where_clauses.append(f"{field} BETWEEN ? AND ?")
-            params.extend(val)
-        elif op == "IN":
-            placeholders = ", ".join(["?"] * len(val))
-            where_clauses.append(f"{field} IN ({placeholders})")
-            params.extend(val)
+        table = get_relation(f["field"])
+        if table is None or table in joined:
+            condition, values = build_condition(field_expression(f["field"], joined), f["op"], f["value"])
         else:
-            where_clauses.append(f"{field} {op} ?")
-            params.append(val)
+            # semi-join: the game qualifies if one of its values matches, the relation
+            # isn't joined into the game rows
+            column = catalog.get_catalog()["fields"][f["field"]]["column"]
+            condition, values = build_condition(f"{table}.{column}", f["op"], f["value"])
+            if f is driving:
+                condition = (
+                    f"games.id IN (SELECT games_{table}.game_id FROM games_{table} "
+                    f"JOIN {table} ON {table}.id = games_{table}.{table}_id WHERE {condition})"
+                )
+            else:
+                condition = (
+                    f"EXISTS (SELECT 1 FROM games_{table} JOIN {table} ON {table}.id = games_{table}.{table}_id "
+                    f"WHERE games_{table}.game_id = games.id AND {condition})"
+                )
+        where_clauses.append(condition)
+        params.extend(values)
 
     return where_clauses, params
 
@@ -262,17 +369,224 @@ def build_having_clause(having: Having) -> tuple[list[str], list[Union[int, floa
 
     return having_clauses, params
 
-def build_order_by_clause(sort_fields):
+def build_order_by_clause(sort_fields, joined=None, selected=None):
     """Build ORDER BY clause from processed sort fields"""
     if not sort_fields:
         return ""
+    joined = joined or set()
+    selected = selected or set()
     
     order_parts = []
     for sort_field in sort_fields:
-        order_parts.append(f"{sort_field['field']} {'ASC' if sort_field['direction'] == 'ASC' else 'DESC'}")
+        field = sort_field["field"]
+        # selected relation lists are sorted by their result column instead of a second subquery
+        column = f"\"{field}\"" if field in selected else field_expression(field, joined)
+        order_parts.append(f"{column} {'ASC' if sort_field['direction'] == 'ASC' else 'DESC'}")
     
     return f"ORDER BY {', '.join(order_parts)}"
 
+def build_query(
+    fields: list[str],
+    sort_fields: list[dict[str, str]],
+    filters: Filters,
+    aggregation: Aggregation,
+    group_by: GroupBy,
+    having: Having,
+    limit: Optional[int],
+    offset: int
+) -> tuple[str, list]:
+    """
+    Builds the SQL query over the base tables for a validated get_data spec. Only
+    grouped relations are joined (one row per game and value); filters on other
+    relations become semi-joins, selected or aggregated relation fields correlated
+    subqueries, so the game rows are never multiplied by unrelated relations.
+    """
+    # full-text filters are answered by games_fts, they need no join of their own
+    match_filters = [f for f in filters if f["op"] == "MATCH"]
+    filters = [f for f in filters if f["op"] != "MATCH"]
+
+    joined = {get_relation(g) for g in group_by} - {None}
+    filter_tables = {get_relation(f["field"]) for f in filters} - {None}
+    selected = (set(fields) | set(group_by)) if fields != ["*"] else set(group_by)
+
+    select_lines = build_select_clause(fields, aggregation, group_by, joined)
+    join_lines = build_join_clause(joined, filter_tables)
+    where_clauses, params = build_where_clause(filters, joined)
+    having_clauses, having_params = build_having_clause(having)
+    params.extend(having_params)
+
+    # without GROUP BY an aggregation is computed per game
+    if group_by:
+        group_line = "GROUP BY " + ", ".join(field_expression(g, joined) for g in group_by)
+    elif aggregation:
+        group_line = "GROUP BY games.id"
+    else:
+        group_line = ""
+    sort_line = build_order_by_clause(sort_fields, joined, selected)
+
+    if match_filters:
+        join_lines.insert(0, "JOIN games_fts ON games_fts.rowid = games.id")
+        where_clauses.insert(0, "games_fts MATCH ?")
+        params.insert(0, fulltext.build_match_query(match_filters))
+        if not sort_line and not group_by:
+            # best matches first
+            sort_line = "ORDER BY games_fts.rank"
+
+    query = f"""
+    SELECT {", ".join(select_lines)}
+    FROM games
+    {"\n".join(join_lines)}
+    {"WHERE " + " AND ".join(where_clauses) if where_clauses else ""}
+    {group_line}
+    {"HAVING " + " AND ".join(having_clauses) if having_clauses else ""}
+    {sort_line}
+    {build_limit_clause(limit, offset)}
+    """
+    params.extend(value for value in (limit, offset) if value)
+
+    return query, params
+
+def build_limit_clause(limit: Optional[int], offset: Optional[int]) -> str:
+    # as parameters, so a new page or limit reuses the compiled plan and statement
+    if not limit and not offset:
+        return ""
+    return f"LIMIT {'?' if limit else -1}{' OFFSET ?' if offset else ''}"
+
+def bind_params(filters: Filters, having: Having, limit: Optional[int], offset: Optional[int]) -> list:
+    """
+    Parameters of a validated spec in the order of the placeholders build_query and
+    route_query emit: full-text query, filter values, HAVING values, limit, offset
+    """
+    params = []
+    match_filters = [f for f in filters if f["op"] == "MATCH"]
+    if match_filters:
+        params.append(fulltext.build_match_query(match_filters))
+    for f in filters:
+        if f["op"] in ("BETWEEN", "IN"):
+            params.extend(f["value"])
+        elif f["op"] != "MATCH":
+            params.append(f["value"])
+    params.extend(condition["value"] for condition in having)
+    params.extend(value for value in (limit, offset) if value)
+    return params
+
+# --- RESULT CACHE ---
+# get_data results of all sessions, key = (query spec, DB generation), in LRU order
+_result_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_cache_stats = {"hits": 0, "misses": 0, "evictions": 0, "bytes": 0, "plan_hits": 0, "plan_misses": 0}
+
+def get_db_generation(conn):
+    """
+    Changes whenever the DB content changes: the generation counter setup_db bumps
+    after every import/sync/migration plus the file times of the DB and its WAL,
+    which also catch the commits of an import that is still running.
+    """
+    try:
+        generation = helpers.get_meta(conn, "generation", 0)
+    except sqlite3.OperationalError:
+        # DB without meta table
+        generation = 0
+    wal_path = config.DB_PATH.with_name(config.DB_PATH.name + "-wal")
+    return (generation,) + tuple(path.stat().st_mtime_ns if path.exists() else 0 for path in (config.DB_PATH, wal_path))
+
+def make_cache_key(spec, generation):
+    # filter values are normalized by the validation, so the key is built from the spec as given
+    return json.dumps(spec, sort_keys=True, default=str), generation
+
+def estimate_size(result):
+    if isinstance(result, pd.DataFrame):
+        return int(result.memory_usage(deep=True).sum())
+    return sum(sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row.values()) for row in result)
+
+def copy_result(result):
+    # callers modify the returned frames (e.g. datetime conversion in Chart.get_dataframe)
+    if isinstance(result, pd.DataFrame):
+        return result.copy()
+    return [dict(row) for row in result]
+
+def get_cached_result(key):
+    with _cache_lock:
+        entry = _result_cache.get(key)
+        if entry is None:
+            _cache_stats["misses"] += 1
+            return None
+        _result_cache.move_to_end(key)
+        _cache_stats["hits"] += 1
+    return copy_result(entry[0])
+
+def store_result(key, result):
+    max_bytes = config.QUERY_CACHE_MB * 1024 * 1024
+    size = estimate_size(result)
+    if size > max_bytes:
+        return
+    with _cache_lock:
+        if key in _result_cache:
+            _cache_stats["bytes"] -= _result_cache.pop(key)[1]
+        _result_cache[key] = (result, size)
+        _cache_stats["bytes"] += size
+        while _cache_stats["bytes"] > max_bytes:
+            _, (_, evicted_size) = _result_cache.popitem(last=False)
+            _cache_stats["bytes"] -= evicted_size
+            _cache_stats["evictions"] += 1
+
+def clear_caches():
+    with _cache_lock:
+        _result_cache.clear()
+        _plan_cache.clear()
+        _cache_stats["bytes"] = 0
+
+# --- PLAN CACHE ---
+# compiled SQL per query shape (the spec without its values), in LRU order
+_plan_cache = OrderedDict()
+
+def make_shape_key(fields, sort_fields, filters, aggregation, group_by, having, limit, offset):
+    shape = [
+        fields, sort_fields, aggregation, group_by,
+        # the number of IN values is part of the SQL, the values themselves are parameters
+        [(f["field"], f["op"], len(f["value"]) if f["op"] == "IN" and isinstance(f["value"], (list, tuple)) else None)
+         for f in filters],
+        [(condition["aggregation"], condition["op"]) for condition in having],
+        bool(limit), bool(offset),
+    ]
+    return json.dumps(shape, sort_keys=True, default=str)
+
+def make_log_spec(fields, sort_fields, filters, aggregation, group_by, having, limit, offset):
+    """The get_data arguments as they are shown in the query log"""
+    return {"fields": fields, "sort_fields": sort_fields, "filters": filters, "aggregation": aggregation,
+            "group_by": group_by, "having": having, "limit": limit, "offset": offset}
+
+def get_cached_plan(key):
+    with _cache_lock:
+        query = _plan_cache.get(key)
+        if query is None:
+            _cache_stats["plan_misses"] += 1
+            return None
+        _plan_cache.move_to_end(key)
+        _cache_stats["plan_hits"] += 1
+        return query
+
+def store_plan(key, query):
+    with _cache_lock:
+        _plan_cache[key] = query
+        _plan_cache.move_to_end(key)
+        while len(_plan_cache) > config.QUERY_PLAN_CACHE_SIZE:
+            _plan_cache.popitem(last=False)
+
+def get_cache_stats():
+    with _cache_lock:
+        stats = dict(_cache_stats)
+        stats["entries"] = len(_result_cache)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+    return stats
+
+def format_cache_stats():
+    stats = get_cache_stats()
+    return (f"{stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%}), "
+            f"{stats['entries']} results in {stats['bytes'] / 1e6:.1f} MB, "
+            f"plans: {stats['plan_hits']} hits, {stats['plan_misses']} misses")
+
 def get_data(
     conn,
     fields: list[str],
@@ -284,6 +598,7 @@ def get_data(
     having: Optional[Having] = None,
     limit: Optional[int] = None,
     offset: Optional[int] = None,
+    cache: bool = True,
 ) -> Union[tuple[str, list], list[dict]]:
     """
     Executes a dynamic SQL query on the 'games' table with flexible selection, filtering,
@@ -310,6 +625,7 @@ def get_data(
                            Example: ["genre"].
         limit (Optional[int]): Maximum number of rows to return.
         offset (Optional[int]): Number of rows to skip (for pagination).
+        cache (bool): Serve the result from the result cache while the DB is unchanged.
 
     Returns:
         list[dict]: List of results as dictionaries (if df=False).
@@ -338,67 +654,197 @@ def get_data(
     sort_fields = sort_fields or []
     having = having or []
     offset = offset or 0
-
-    validate_get_data_input(fields, sort_fields, filters, aggregation, group_by, limit, having, offset)
-
-    aggregation_fields = {agg["field"] for agg in aggregation.values()}
-    aggregation_aliases = set(aggregation.keys())
-
-    used_fields = (
-        {str(f) for f in fields}
-        | {str(f['field']) for f in filters}
-        | set(str(g) for g in group_by)
-        | aggregation_fields
-        | {str(v["field"]) for v in sort_fields}
+    start = time.perf_counter()
+    if config.QUERY_LOG_ENABLED:
+        log_spec = make_log_spec(fields, sort_fields, filters, aggregation, group_by, having, limit, offset)
+
+    generation = get_db_generation(conn)
+    use_cache = cache and config.QUERY_CACHE_MB > 0
+    if use_cache:
+        cache_key = make_cache_key([fields, sort_fields, filters, df, aggregation, group_by, having, limit, offset], generation)
+        cached = get_cached_result(cache_key)
+        if cached is not None:
+            if config.QUERY_LOG_ENABLED:
+                query_log.record(conn, log_spec, None, None, time.perf_counter() - start, len(cached), cached=True)
+            return cached
+
+    query, params = prepare_query(conn, fields, sort_fields, filters, aggregation, group_by, having, limit, offset, generation)
+    try:
+        chunks = list(iter_chunks(conn, query, params, df))
+    except Exception as e:
+        print("Failed Query:\n", query)
+        print("With Params:\n", params)
+        raise e
+    if df:
+        # a column that is NULL in a whole chunk comes back as object, infer_objects restores the type
+        results = chunks[0] if len(chunks) == 1 else pd.concat(chunks, ignore_index=True).infer_objects()
+        results = decode_frame(results, aggregation)
+    else:
+        results = decode_rows([row for chunk in chunks for row in chunk], aggregation)
+
+    if config.QUERY_LOG_ENABLED:
+        query_log.record(conn, log_spec, query, params, time.perf_counter() - start, len(results))
+    if use_cache:
+        store_result(cache_key, results)
+        return copy_result(results)
+    return results
+
+def prepare_query(conn, fields, sort_fields, filters, aggregation, group_by, having, limit, offset, generation=None):
+    """Validates a get_data spec (with defaults applied) and returns (query, params)"""
+    generation = generation or get_db_generation(conn)
+    # a known shape with new values (e.g. a moved date slider) skips validation and planning;
+    # summary tables and the catalog change the plan, so their state is part of the key
+    plan_key = (
+        make_shape_key(fields, sort_fields, filters, aggregation, group_by, having, limit, offset),
+        generation[0], config.USE_AGGREGATE_TABLES, catalog.get_file_stamp()
     )
-
-    used_fields -= aggregation_aliases
-
-    mapping = helpers.load_mapping(config.DB_MAPPING_PATH)
-    field_table_map = {e[0]: e[1] for e in mapping}
-    field_table_map["languages.name"] = "languages"
-
-    select_lines = build_select_clause(fields, aggregation, group_by)
-    join_lines, join_selects = build_join_clause(used_fields, field_table_map)
-    where_clauses, params = build_where_clause(filters)
-    having_clauses, having_params = build_having_clause(having)
-    params.extend(having_params)
-
-    full_select = select_lines + join_selects
-    sort_line = build_order_by_clause(sort_fields)
-
-    query = f"""
-    SELECT {", ".join(full_select)}
-    FROM games
-    {"\n".join(join_lines)}
-    {"WHERE " + " AND ".join(where_clauses) if where_clauses else ""}
-    {"GROUP BY " + ", ".join(group_by) if group_by else "GROUP BY games.id"}
-    {"HAVING " + " AND ".join(having_clauses) if having_clauses else ""}
-    {f"ORDER BY {sort_line}" if sort_line else ""}
-    {f"LIMIT {limit}" if limit else ""}
-    {f"OFFSET {offset}" if offset else ""}
+    query = get_cached_plan(plan_key)
+    if query is None:
+        validate_query_structure(fields, sort_fields, filters, aggregation, group_by, having)
+    validate_query_values(filters, having, limit, offset)
+
+    if query is None:
+        # summary tables answer the common "aggregate per genre/platform/..." shapes
+        routed = aggregates.route_query(conn, fields, filters, aggregation, group_by, having, sort_fields, limit, offset)
+        query, _ = routed or build_query(fields, sort_fields, filters, aggregation, group_by, having, limit, offset)
+        store_plan(plan_key, query)
+    return query, bind_params(filters, having, limit, offset)
+
+def iter_chunks(conn, query, params, df=True, chunk_size=None):
     """
+    Executes the query and yields the raw result in chunks of chunk_size rows: DataFrames
+    or lists of dicts, decoded by decode_frame/decode_rows. Only one chunk of raw rows
+    is held in memory at a time.
+    """
+    chunk_size = chunk_size or config.QUERY_CHUNK_ROWS
+    if df:
+        yield from pd.read_sql_query(query, conn, params=params, chunksize=chunk_size)
+        return
+
+    cursor = conn.cursor()
+    cursor.execute(query, params)
+    columns = [description[0] for description in cursor.description]
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        yield [dict(zip(columns, row)) for row in rows]
+
+def iter_data(
+    conn,
+    fields: list[str],
+    sort_fields: Optional[list[dict[str, str]]] = None,
+    filters: Optional[Filters] = None,
+    df: bool = True,
+    aggregation: Optional[Aggregation] = None,
+    group_by: Optional[GroupBy] = None,
+    having: Optional[Having] = None,
+    limit: Optional[int] = None,
+    offset: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+):
+    """
+    Streaming variant of get_data for results that don't need to be in memory at once
+    (exports, full-catalogue scans): yields chunks of chunk_size rows (QUERY_CHUNK_ROWS
+    by default) as DataFrames or, with df=False, as lists of dicts, decoded like the
+    get_data result. Categorical columns are built per chunk. The result cache is bypassed.
 
-    if not df:
+    Example:
+        for chunk in iter_data(conn, fields=["games.name", "games.rating"]):
+            chunk.to_csv(path, mode="a", header=not path.exists(), index=False)
+    """
+    filters = filters or []
+    aggregation = aggregation or {}
+    group_by = group_by or []
+    sort_fields = sort_fields or []
+    having = having or []
+    offset = offset or 0
+    start = time.perf_counter()
+
+    query, params = prepare_query(conn, fields, sort_fields, filters, aggregation, group_by, having, limit, offset)
+    rows = 0
+    try:
+        for chunk in iter_chunks(conn, query, params, df, chunk_size):
+            rows += len(chunk)
+            yield decode_frame(chunk, aggregation) if df else decode_rows(chunk, aggregation)
+    finally:
+        # also runs when the caller stops early (break closes the generator)
+        if config.QUERY_LOG_ENABLED:
+            log_spec = make_log_spec(fields, sort_fields, filters, aggregation, group_by, having, limit, offset)
+            query_log.record(conn, log_spec, query, params, time.perf_counter() - start, rows)
+
+# --- RESULT DECODING ---
+def get_column_type(column, aggregation):
+    """
+    (type, categorical) of a result column from the catalog: the whitelist type of a
+    field or the type an aggregation returns; (None, False) for unknown columns
+    """
+    fields = catalog.get_catalog()["fields"]
+    if column in aggregation:
+        function = aggregation[column]["function"].upper()
+        info = fields.get(aggregation[column]["field"])
+        if function == "COUNT":
+            return "int", False
+        if info is None or function == "AVG":
+            return "float", False
+        if function == "SUM":
+            return ("int" if info["type"] == "int" else "float"), False
+        # MIN/MAX keep the type of the field
+        return info["type"], False
+
+    # columns of the line chart are named without the games prefix
+    info = fields.get(column) or fields.get(f"games.{column}")
+    if info is None:
+        return None, False
+    # reference names (genres, platforms, ...) repeat over the rows
+    return info["type"], info["type"] == "str" and info["table"] != "games"
+
+def unix_to_datetime64(values, unit="ns"):
+    """Unix seconds (NULL/NaN allowed) -> datetime64 array with NaT for the missing values"""
+    seconds = np.asarray(values, dtype="float64")
+    missing = np.isnan(seconds)
+    # over numpy integers, pandas' unit conversion of float columns with NaN is much slower
+    result = np.where(missing, 0, seconds).astype("int64").astype("datetime64[s]").astype(f"datetime64[{unit}]")
+    result[missing] = np.datetime64("NaT", unit)
+    return result
+
+def decode_frame(df, aggregation=None):
+    """
+    Converts the raw SQLite columns of a result in one vectorized pass per column:
+    datetime fields (unix seconds) to datetime64, integer fields and counts to nullable
+    Int64, floats to float64 and reference names with repeated values to categoricals
+    """
+    aggregation = aggregation or {}
+    for column in df.columns:
+        type_name, categorical = get_column_type(column, aggregation)
+        series = df[column]
         try:
-            cursor = conn.cursor()
-            cursor.execute(query, params)
-            results = [dict(row) for row in cursor.fetchall()]
-
-            with open(config.QUERY_WHITELIST_PATH, "r", encoding="utf-8") as f:
-                whitelist = json.load(f)
-                for row in results:
-                    for field in row:
-                        if field in whitelist and whitelist[field]["type"] == "datetime":
-                            row[field] = convert_from_unix(row[field])
-            
-            return results
-        except Exception as e:
-            print("Failed Query:\n", query)
-            print("With Params:\n", params)
-            raise e
-    else:
-        df = pd.read_sql_query(query, conn, params=params)
-        return df
-
-
+            if type_name == "datetime":
+                # nanoseconds like older pandas versions, the chart code relies on it
+                df[column] = pd.Series(unix_to_datetime64(pd.to_numeric(series)), index=df.index)
+            elif type_name == "int":
+                df[column] = pd.to_numeric(series).astype("Int64")
+            elif type_name == "float":
+                df[column] = pd.to_numeric(series).astype("float64")
+            elif categorical:
+                values = series.astype("category")
+                if len(values.cat.categories) <= len(series) // 2:
+                    df[column] = values
+        except (TypeError, ValueError):
+            # e.g. a non-integral SUM, the column keeps the type SQLite returned
+            continue
+    return df
+
+def decode_rows(rows, aggregation=None):
+    """df=False variant of decode_frame: datetime columns become datetime objects (None for NULL)"""
+    if not rows:
+        return rows
+    aggregation = aggregation or {}
+    for column in rows[0]:
+        if get_column_type(column, aggregation)[0] != "datetime":
+            continue
+        # numpy turns datetime64[us] into datetime objects and NaT into None
+        values = unix_to_datetime64([row[column] for row in rows], "us").astype(object)
+        for row, value in zip(rows, values):
+            row[column] = value
+    return rows
@@ -0,0 +1,46 @@
+import config
+import json
+
+def load_index_specs(mapping_path=None):
+    """
+    Reads the secondary indexes from the DB mapping as (index name, table, columns):
+        - fields with "indexed": true get a value index (filters, sorting, MIN/MAX)
+        - every relation gets a reverse index on its link table, so filters and
+          groupings by a reference entry don't scan the whole link table
+    """
+    with open(mapping_path or config.DB_MAPPING_PATH, encoding="utf-8") as f:
+        mapping_json = json.load(f)
+
+    specs = []
+    for table, table_data in mapping_json["tables"].items():
+        for field, data in table_data.get("fields", {}).items():
+            if data.get("indexed"):
+                specs.append((f"idx_{table}_{field}", table, (field,)))
+
+        for rel_data in table_data.get("relations", {}).values():
+            target = rel_data["target_table"]
+            # (ref_id, game_id) covers the join back to games without a table lookup
+            specs.append((f"idx_games_{target}_reverse", f"games_{target}", (f"{target}_id", "game_id")))
+
+    return specs
+
+def create_indexes(cursor, mapping_path=None):
+    """Creates the missing secondary indexes, returns the names of the new ones"""
+    existing = {row[0] for row in cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    tables = {row[0] for row in cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+    created = []
+    for name, table, columns in load_index_specs(mapping_path):
+        if name in existing or table not in tables:
+            continue
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})")
+        created.append(name)
+
+    if created:
+        print(f"Created {len(created)} indexes")
+    return created
+
+def drop_indexes(cursor, mapping_path=None):
+    """Drops the secondary indexes of the mapping (e.g. before a bulk load or for benchmarks)"""
+    for name, _, _ in load_index_specs(mapping_path):
+        cursor.execute(f"DROP INDEX IF EXISTS {name}")
@@ -1,53 +1,85 @@
+import config
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+def compile_mapping(mapping):
+    """
+    Compiles the mapping list into a flat accessor plan, so the api_field strings
+    are split once instead of for every game:
+        game_fields: (column, key path) pairs for the games table
+        relations:   (table, key path) pairs leading to the {"id", "name"} objects,
+                     one entry per relation instead of separate .id/.name entries
+    """
+    game_fields = []
+    relations = {}
+
+    for api_field, table, column in mapping:
+        parts = tuple(api_field.split("."))
+        if table == "games":
+            if column != "id":
+                game_fields.append((column, parts))
+        else:
+            # "platforms.id"/"platforms.name" -> ("platforms",)
+            relations.setdefault(table, parts[:-1])
+
+    return {
+        "game_fields": game_fields,
+        "relations": list(relations.items())
+    }
+
+
+
+def collect_id_name_pairs(data, path):
+    """Follows the key path through nested dicts/lists and returns the (id, name) pairs at its end"""
+    items = data.get(path[0])
+    if items is None:
+        return []
+    if not isinstance(items, list):
+        items = [items]
+
+    # e.g. language_supports.language: one nested object per list entry
+    for part in path[1:]:
+        next_items = []
+        for item in items:
+            value = item.get(part) if isinstance(item, dict) else None
+            if isinstance(value, list):
+                next_items.extend(value)
+            elif value is not None:
+                next_items.append(value)
+        items = next_items
+
+    return [
+        (item["id"], item["name"]) for item in items
+        if isinstance(item, dict) and "id" in item and "name" in item
+    ]
+
+
+
+def extract_insert_data(games_data, mapping, plan=None):
+    plan = plan or compile_mapping(mapping)
+    game_fields = plan["game_fields"]
+    relations = plan["relations"]
 
-def extract_insert_data(games_data, mapping):
     game_inserts = []
     ref_inserts = {}
     link_inserts = {}
-    
-    def find_id_name_recursive(data):
-        """goes recursively through data until (id, name) pairs are found"""
-        results = []
-
-        if isinstance(data, dict):
-            if "id" in data and "name" in data:
-                results.append((data["id"], data["name"]))
-            else:
-                for value in data.values():
-                    results.extend(find_id_name_recursive(value))
 
-        elif isinstance(data, list):
-            for item in data:
-                results.extend(find_id_name_recursive(item))
+    for game_data in games_data:
+        game_id = game_data["id"]
+        game_entry = {"id": game_id}
 
-        return results
+        for column, parts in game_fields:
+            value = game_data.get(parts[0])
+            for part in parts[1:]:
+                value = value.get(part) if isinstance(value, dict) else None
+            if value is not None:
+                game_entry[column] = value
 
-    for game_data in games_data:
-        game_entry = {"id": game_data["id"]}
-
-        for api_field, table, column in mapping:
-            data = game_data
-            parts = api_field.split(".")
-            for part in parts:
-                if isinstance(data, dict) and part in data:
-                    data = data[part]
-                elif isinstance(data, list):
-                    break
-                else:
-                    data = None
-                    break
-
-            if data is None:
-                continue
-
-            if table == "games":
-                game_entry[column] = data
-
-            else:
-                found_entries = find_id_name_recursive(data)
-                for sub_id, sub_name in found_entries:
-                    ref_inserts.setdefault(table, set()).add((sub_id, sub_name))
-                    link_table = f"games_{table}"
-                    link_inserts.setdefault(link_table, set()).add((game_data["id"], sub_id))
+        for table, path in relations:
+            pairs = collect_id_name_pairs(game_data, path)
+            if pairs:
+                ref_inserts.setdefault(table, set()).update(pairs)
+                link_inserts.setdefault(f"games_{table}", set()).update((game_id, sub_id) for sub_id, _ in pairs)
 
         game_inserts.append(game_entry)
 
@@ -56,9 +88,6 @@ def extract_insert_data(games_data, mapping):
 
 
 def insert_game_batches(cursor, games_data):
-    print("Spiele:", len(games_data.get("games", [])))
-    print("Referenzen:", {k: len(v) for k, v in games_data.get("refs", {}).items()})
-    print("Links:", {k: len(v) for k, v in games_data.get("links", {}).items()})
     # Spiele einfügen
     if games_data["games"]:
         columns = sorted({key for game in games_data["games"] for key in game})
@@ -83,4 +112,211 @@ def insert_game_batches(cursor, games_data):
         cursor.executemany(
             f"INSERT OR IGNORE INTO {link_table} (game_id, {ref_name}_id) VALUES (?, ?)",
             values
-        )
\ No newline at end of file
+        )
+
+
+
+def extract_pages(pages, mapping):
+    """Extracts every raw page; yields (page, games_data) pairs for the DB and export writers"""
+    plan = compile_mapping(mapping)
+    for page in pages:
+        game_inserts, ref_inserts, link_inserts = extract_insert_data(page, mapping, plan)
+
+        yield page, {
+            "games": game_inserts,
+            "refs": ref_inserts,
+            "links": link_inserts
+        }
+
+
+
+def merge_games_data(target, games_data):
+    target["games"].extend(games_data["games"])
+    for key in ("refs", "links"):
+        for table, values in games_data[key].items():
+            target[key].setdefault(table, set()).update(values)
+
+
+
+# per-process state of the extraction workers, set by init_extract_worker
+_worker = {}
+
+def init_extract_worker(plan, read_page=None, make_filter=None):
+    _worker["plan"] = plan
+    _worker["read_page"] = read_page
+    _worker["keep"] = make_filter() if make_filter else None
+
+
+
+def extract_shard(sources):
+    """Process-pool worker: loads, filters and extracts several raw pages into one deduplicated result"""
+    plan, read_page, keep = _worker["plan"], _worker["read_page"], _worker["keep"]
+    games_data = {"games": [], "refs": {}, "links": {}}
+
+    for source in sources:
+        page = read_page(source) if read_page else source
+        if keep:
+            page = [game for game in page if keep(game)]
+        game_inserts, ref_inserts, link_inserts = extract_insert_data(page, None, plan)
+        merge_games_data(games_data, {
+            "games": game_inserts,
+            "refs": ref_inserts,
+            "links": link_inserts
+        })
+    return games_data
+
+
+
+def iter_shards(pages, shard_pages):
+    shard = []
+    for page in pages:
+        shard.append(page)
+        if len(shard) == shard_pages:
+            yield shard
+            shard = []
+    if shard:
+        yield shard
+
+
+
+def extract_pages_parallel(sources, mapping, read_page=None, make_filter=None, workers=None, shard_pages=None):
+    """
+    Parallel variant of extract_pages for large raw dumps. The sources (raw pages, or
+    e.g. cache files together with a top-level `read_page` function) are sharded across
+    a process pool; every worker loads, filters (`make_filter` builds the predicate
+    once per process) and extracts its shard. Decoding in the workers matters: pickling
+    decoded pages to them costs about as much as the extraction itself.
+
+    Yields (last source of the shard, merged games_data) in input order for the single
+    SQLite writer, with at most two shards per worker in flight.
+    """
+    workers = workers or config.EXTRACT_WORKERS
+    shard_pages = shard_pages or config.EXTRACT_SHARD_PAGES
+    plan = compile_mapping(mapping)
+    in_flight = deque()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_extract_worker,
+                             initargs=(plan, read_page, make_filter)) as executor:
+        for shard in iter_shards(sources, shard_pages):
+            in_flight.append((shard[-1], executor.submit(extract_shard, shard)))
+            if len(in_flight) >= 2 * workers:
+                last_source, future = in_flight.popleft()
+                yield last_source, future.result()
+
+        while in_flight:
+            last_source, future = in_flight.popleft()
+            yield last_source, future.result()
+
+
+
+def ingest_pages(conn, extracted_pages, on_commit=None, commit_every=1, mapping=None):
+    """
+    Inserts the extracted games page by page. Every `commit_every` pages are committed
+    in their own transaction, so memory stays flat and an aborted run keeps what it
+    already wrote. on_commit(page) is called after each commit with the last
+    committed page (e.g. to store a checkpoint).
+    With a mapping, the pages are upserted into an existing DB (upsert_game_batches).
+    """
+    cursor = conn.cursor()
+    totals = {"games": 0, "links": 0, "changed": 0}
+    page = None
+
+    for counter, (page, games_data) in enumerate(extracted_pages, start=1):
+        if mapping:
+            totals["changed"] += upsert_game_batches(cursor, games_data, mapping)
+        else:
+            insert_game_batches(cursor, games_data)
+
+        totals["games"] += len(games_data["games"])
+        totals["links"] += sum(len(v) for v in games_data["links"].values())
+
+        if counter % commit_every == 0:
+            conn.commit()
+            if on_commit:
+                on_commit(page)
+            print(f"Page {counter}: committed {totals['games']} games in total")
+
+    conn.commit()
+    if on_commit and page:
+        on_commit(page)
+
+    print("Spiele:", totals["games"])
+    print("Links:", totals["links"])
+    if mapping:
+        print("Geändert:", totals["changed"])
+    return totals
+
+
+
+def filter_changed_games(cursor, games_data):
+    """Returns the games that are new or whose IGDB checksum differs from the stored one"""
+    ids = [game["id"] for game in games_data]
+    placeholders = ", ".join(["?"] * len(ids))
+    stored = dict(cursor.execute(
+        f"SELECT id, checksum FROM games WHERE id IN ({placeholders})", ids
+    ).fetchall())
+
+    return [game for game in games_data if game["id"] not in stored or stored[game["id"]] != game.get("checksum")]
+
+
+
+def upsert_game_batches(cursor, games_data, mapping):
+    """
+    Upserts extracted games instead of ignoring known ids. Only new games and games
+    whose IGDB checksum changed are written; their link rows are diffed against the
+    stored ones, so dropped relations are deleted and unchanged rows are not touched.
+    Returns the number of changed games.
+    """
+    changed_games = filter_changed_games(cursor, games_data["games"]) if games_data["games"] else []
+
+    columns = [column for _, table, column in mapping if table == "games"]
+    placeholders = ", ".join(["?"] * len(columns))
+    updates = ", ".join(f"{col} = excluded.{col}" for col in columns if col != "id")
+    cursor.executemany(
+        f"INSERT INTO games ({', '.join(columns)}) VALUES ({placeholders}) "
+        f"ON CONFLICT(id) DO UPDATE SET {updates} WHERE games.checksum IS NOT excluded.checksum",
+        [tuple(game.get(col) for col in columns) for game in changed_games]
+    )
+
+    # renamed entries are updated, identical ones cause no write
+    for table, values in games_data["refs"].items():
+        cursor.executemany(
+            f"INSERT INTO {table} (id, name) VALUES (?, ?) "
+            f"ON CONFLICT(id) DO UPDATE SET name = excluded.name WHERE name IS NOT excluded.name",
+            values
+        )
+
+    if not changed_games:
+        return 0
+
+    # Links diffen, auch für Relationen ohne neue Einträge
+    game_ids = [game["id"] for game in changed_games]
+    changed_ids = set(game_ids)
+    id_placeholders = ", ".join(["?"] * len(game_ids))
+    for table in sorted({table for _, table, _ in mapping if table != "games"}):
+        link_table = f"games_{table}"
+        new_links = {link for link in games_data["links"].get(link_table, ()) if link[0] in changed_ids}
+        stored_links = set(cursor.execute(
+            f"SELECT game_id, {table}_id FROM {link_table} WHERE game_id IN ({id_placeholders})", game_ids
+        ).fetchall())
+
+        cursor.executemany(
+            f"DELETE FROM {link_table} WHERE game_id = ? AND {table}_id = ?",
+            stored_links - new_links
+        )
+        cursor.executemany(
+            f"INSERT OR IGNORE INTO {link_table} (game_id, {table}_id) VALUES (?, ?)",
+            new_links - stored_links
+        )
+
+    return len(changed_games)
+
+
+
+def sync_pages(conn, pages, mapping):
+    """
+    Delta sync: the updated games are upserted page by page, only games whose
+    checksum changed (or that are new) are written.
+    """
+    totals = ingest_pages(conn, extract_pages(pages, mapping), mapping=mapping)
+    return totals["changed"]
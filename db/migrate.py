@@ -0,0 +1,71 @@
+import db.db_helpers as helpers
+import db.schema as schema
+import db.insert_data as insert
+import json
+
+def record_schema(cursor, mapping):
+    """Stores the mapping the schema now matches and bumps the schema version"""
+    version = int(helpers.get_meta(cursor, "schema_version", 0)) + 1
+    helpers.set_meta(cursor, "schema_version", version)
+    helpers.set_meta(cursor, "schema_mapping", json.dumps(mapping))
+    return version
+
+def diff_schema(cursor, mapping):
+    """
+    Compares the mapping with the live schema and returns the mapping entries whose
+    games column or relation tables don't exist yet. Removed fields are left alone.
+    """
+    existing_columns = {row[1] for row in cursor.execute("PRAGMA table_info(games)")}
+    existing_tables = {row[0] for row in cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+    new_entries = []
+    for entry in mapping:
+        _, table, column = entry
+        if table == "games":
+            missing = column not in existing_columns
+        else:
+            missing = f"games_{table}" not in existing_tables
+        if missing and entry not in new_entries:
+            new_entries.append(entry)
+    return new_entries
+
+def apply_schema_changes(cursor, new_entries):
+    column_types = schema.load_game_columns()
+    for _, table, column in new_entries:
+        if table == "games":
+            schema.add_games_column(cursor, column, column_types[column])
+
+    for table in schema.get_ref_tables(new_entries):
+        schema.create_reference_and_m2m_tables(cursor, table)
+
+def backfill_pages(conn, pages, new_entries):
+    """
+    Writes only the new fields of the raw pages: UPDATEs for new games columns,
+    reference and link rows for new relations. Games that aren't in the DB are
+    skipped, every page is committed on its own. Returns the number of updated games.
+    """
+    plan = insert.compile_mapping(new_entries)
+    columns = [column for column, _ in plan["game_fields"]]
+    cursor = conn.cursor()
+    updated = 0
+
+    for page in pages:
+        ids = [game["id"] for game in page]
+        placeholders = ", ".join(["?"] * len(ids))
+        known_ids = {row[0] for row in cursor.execute(f"SELECT id FROM games WHERE id IN ({placeholders})", ids)}
+        game_inserts, ref_inserts, link_inserts = insert.extract_insert_data(
+            [game for game in page if game["id"] in known_ids], None, plan
+        )
+
+        if columns:
+            cursor.executemany(
+                f"UPDATE games SET {', '.join(f'{column} = ?' for column in columns)} WHERE id = ?",
+                [tuple(game.get(column) for column in columns) + (game["id"],) for game in game_inserts]
+            )
+        insert.insert_game_batches(cursor, {"games": [], "refs": ref_inserts, "links": link_inserts})
+        conn.commit()
+
+        updated += len(game_inserts)
+        print(f"Backfilled {updated} games")
+
+    return updated
@@ -0,0 +1,85 @@
+import config
+import json
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+# EXPLAIN QUERY PLAN per SQL text, the plan cache keeps the texts stable
+_plans = {}
+_plans_lock = threading.Lock()
+_log_lock = threading.Lock()
+# entries of the capture() blocks of the current thread (one Streamlit session per thread)
+_local = threading.local()
+
+def explain(conn, query, params):
+    """EXPLAIN QUERY PLAN details of a query, one line per step"""
+    with _plans_lock:
+        if query in _plans:
+            return _plans[query]
+    plan = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + query, params)]
+    with _plans_lock:
+        if len(_plans) >= config.QUERY_PLAN_CACHE_SIZE:
+            _plans.clear()
+        _plans[query] = plan
+    return plan
+
+def plan_flags(plan):
+    """The steps that usually make a plot slow: full table scans and temporary B-trees"""
+    flags = []
+    for detail in plan:
+        # FTS5 lookups show up as scans of the virtual table
+        if detail.startswith("SCAN ") and "VIRTUAL TABLE" not in detail:
+            flags.append(f"full scan of {detail[5:]}")
+        if "TEMP B-TREE" in detail:
+            flags.append(detail.lower())
+    return flags
+
+def record(conn, spec, query, params, seconds, rows, cached=False):
+    """
+    Logs one get_data call: wall time, rows and (for executed queries) the query plan.
+    Calls slower than SLOW_QUERY_MS are appended to the slow-query log.
+    """
+    entry = {
+        "time": datetime.now().isoformat(timespec="seconds"),
+        "ms": round(seconds * 1000, 2),
+        "rows": rows,
+        "cached": cached,
+        "spec": spec,
+        "sql": query,
+        "params": params,
+        "plan": [],
+        "flags": [],
+    }
+    if query is not None:
+        entry["plan"] = explain(conn, query, params)
+        entry["flags"] = plan_flags(entry["plan"])
+    entry["slow"] = entry["ms"] >= config.SLOW_QUERY_MS
+
+    if entry["slow"]:
+        with _log_lock:
+            with open(config.SLOW_QUERY_LOG_PATH, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, default=str) + "\n")
+
+    for entries in getattr(_local, "captures", []):
+        entries.append(entry)
+    return entry
+
+@contextmanager
+def capture():
+    """Collects the entries of all get_data calls inside the block, e.g. of one plot"""
+    if not hasattr(_local, "captures"):
+        _local.captures = []
+    entries = []
+    _local.captures.append(entries)
+    try:
+        yield entries
+    finally:
+        _local.captures.pop()
+
+def read_slow_log(limit=20):
+    """The last slow queries, newest first"""
+    if not config.SLOW_QUERY_LOG_PATH.exists():
+        return []
+    with open(config.SLOW_QUERY_LOG_PATH, encoding="utf-8") as f:
+        lines = f.readlines()[-limit:]
+    return [json.loads(line) for line in reversed(lines) if line.strip()]
@@ -1,3 +1,6 @@
+import config
+import json
+
 def create_api2db_map_table(cursor):
     cursor.execute("""
     CREATE TABLE IF NOT EXISTS api2db_map (
@@ -22,28 +25,40 @@ def insert_api2db_map(cursor, mapping_list):
             entry["table_field_name"]
         ))
 
-def create_games_table(cursor):
-    cursor.execute("""
+# mapping type -> SQLite column type
+SQL_TYPES = {
+    "integer": "INTEGER",
+    "float": "REAL",
+    "text": "TEXT",
+    "datetime": "INTEGER"
+}
+
+def load_game_columns(mapping_path=None):
+    """games columns of the mapping as {column: mapping type}"""
+    with open(mapping_path or config.DB_MAPPING_PATH, encoding="utf-8") as f:
+        fields = json.load(f)["tables"]["games"]["fields"]
+    return {column: data["type"] for column, data in fields.items()}
+
+def get_ref_tables(mapping):
+    """Reference tables of the (api_field, table, column) mapping entries"""
+    return sorted({table for _, table, _ in mapping if table != "games"})
+
+def create_games_table(cursor, mapping_path=None):
+    columns = ",\n            ".join(
+        f"{column} {SQL_TYPES[type_name]}" + (" PRIMARY KEY" if column == "id" else "")
+        for column, type_name in load_game_columns(mapping_path).items()
+    )
+    cursor.execute(f"""
         CREATE TABLE IF NOT EXISTS games (
-            id INTEGER PRIMARY KEY,
-            name TEXT,
-            slug TEXT,
-            summary TEXT,
-            checksum TEXT,
-            url TEXT,
-            first_release_date INTEGER,
-            cover_url TEXT,
-            cover_image_id INTEGER,
-            aggregated_rating REAL,
-            aggregated_rating_count INTEGER,
-            rating REAL,
-            rating_count INTEGER,
-            total_rating REAL
+            {columns}
         )
         """)
 
+def add_games_column(cursor, column, type_name):
+    cursor.execute(f"ALTER TABLE games ADD COLUMN {column} {SQL_TYPES[type_name]}")
+
 
-def create_reference_and_m2m_tables(cursor, table):
+def create_reference_and_m2m_tables(cursor, table, deferred_key=False):
     cursor.execute(f"""
     CREATE TABLE IF NOT EXISTS {table} (
         id INTEGER PRIMARY KEY,
@@ -51,6 +66,18 @@ def create_reference_and_m2m_tables(cursor, table):
     )
     """)
 
+    if deferred_key:
+        # bulk load: the key index is built once after the load, see create_link_key_index
+        cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS games_{table} (
+            game_id INTEGER,
+            {table}_id INTEGER,
+            FOREIGN KEY (game_id) REFERENCES games(id),
+            FOREIGN KEY ({table}_id) REFERENCES {table}(id)
+        )
+        """)
+        return
+
     cursor.execute(f"""
     CREATE TABLE IF NOT EXISTS games_{table} (
         game_id INTEGER,
@@ -59,4 +86,31 @@ def create_reference_and_m2m_tables(cursor, table):
         FOREIGN KEY (game_id) REFERENCES games(id),
         FOREIGN KEY ({table}_id) REFERENCES {table}(id)
     )
-    """)
\ No newline at end of file
+    """)
+
+
+def create_link_key_index(cursor, table):
+    """Unique (game_id, {table}_id) key for link tables created with deferred_key"""
+    columns = cursor.execute(f"PRAGMA table_info(games_{table})").fetchall()
+    if any(column[5] for column in columns):
+        # table has its primary key already
+        return
+
+    # without the key INSERT OR IGNORE doesn't deduplicate, repeated games (a resumed
+    # import, overlapping pages) leave duplicate links that would fail the index
+    cursor.execute(f"""
+    DELETE FROM games_{table}
+    WHERE rowid NOT IN (SELECT MIN(rowid) FROM games_{table} GROUP BY game_id, {table}_id)
+    """)
+    cursor.execute(f"""
+    CREATE UNIQUE INDEX IF NOT EXISTS games_{table}_key ON games_{table} (game_id, {table}_id)
+    """)
+
+
+def create_meta_table(cursor):
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS meta (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    )
+    """)
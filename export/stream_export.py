@@ -0,0 +1,139 @@
+import config
+import csv
+import json
+
+# mapping type -> pyarrow type name
+PARQUET_TYPES = {
+    "integer": "int64",
+    "float": "float64",
+    "text": "string",
+    "datetime": "timestamp"
+}
+
+class StreamExporter:
+    """
+    Writes the extracted games, reference and link tables while the pages arrive.
+    Every table gets its own CSV and (if pyarrow is installed) Parquet file; only
+    one Parquet row group per table is buffered, so memory stays bounded.
+
+    Usage:
+        with StreamExporter() as exporter:
+            for page, games_data in exporter.export_pages(extracted_pages):
+                ...
+    """
+    def __init__(self, export_path=None, formats=None):
+        self.export_path = export_path or config.EXPORT_PATH
+        self.formats = formats or config.EXPORT_FORMATS
+        self.export_path.mkdir(parents=True, exist_ok=True)
+
+        with open(config.DB_MAPPING_PATH, encoding="utf-8") as f:
+            game_fields = json.load(f)["tables"]["games"]["fields"]
+        self.game_columns = list(game_fields)
+        self.game_types = {column: data["type"] for column, data in game_fields.items()}
+
+        self.csv_files = {}
+        self.csv_writers = {}
+        self.parquet_writers = {}
+        self.parquet_buffers = {}
+        self.seen_refs = {}
+        self.pa = None
+        self.pq = None
+
+        if "parquet" in self.formats:
+            try:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+                self.pa, self.pq = pa, pq
+            except ImportError:
+                print("pyarrow is not installed, Parquet export skipped")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def table_columns(self, table):
+        if table == "games":
+            return self.game_columns
+        if table.startswith("games_"):
+            return ["game_id", f"{table.split('_', 1)[1]}_id"]
+        return ["id", "name"]
+
+    def parquet_type(self, table, column):
+        pa = self.pa
+        if table == "games":
+            type_name = PARQUET_TYPES[self.game_types[column]]
+        else:
+            type_name = "string" if column == "name" else "int64"
+
+        if type_name == "timestamp":
+            return pa.timestamp("s")
+        return getattr(pa, type_name)()
+
+    def write_rows(self, table, rows):
+        if not rows:
+            return
+        columns = self.table_columns(table)
+
+        if "csv" in self.formats:
+            if table not in self.csv_writers:
+                f = open(self.export_path / f"{table}.csv", "w", newline="", encoding="utf-8")
+                self.csv_files[table] = f
+                self.csv_writers[table] = csv.writer(f)
+                self.csv_writers[table].writerow(columns)
+            self.csv_writers[table].writerows(rows)
+
+        if self.pa is not None:
+            buffer = self.parquet_buffers.setdefault(table, [])
+            buffer.extend(rows)
+            if len(buffer) >= config.EXPORT_ROW_GROUP_SIZE:
+                self.flush_parquet(table)
+
+    def flush_parquet(self, table):
+        rows = self.parquet_buffers.get(table)
+        if not rows:
+            return
+        pa = self.pa
+        columns = self.table_columns(table)
+        schema = pa.schema([(column, self.parquet_type(table, column)) for column in columns])
+        arrays = [pa.array(values, type=schema.field(column).type) for column, values in zip(columns, zip(*rows))]
+
+        if table not in self.parquet_writers:
+            self.parquet_writers[table] = self.pq.ParquetWriter(
+                self.export_path / f"{table}.parquet", schema, compression="zstd"
+            )
+        self.parquet_writers[table].write_table(pa.Table.from_arrays(arrays, schema=schema))
+        rows.clear()
+
+    def write_page(self, games_data):
+        columns = self.game_columns
+        self.write_rows("games", [tuple(game.get(col) for col in columns) for game in games_data["games"]])
+
+        # reference rows repeat on every page, each id is written once
+        for table, values in games_data["refs"].items():
+            seen = self.seen_refs.setdefault(table, set())
+            new_rows = sorted((row for row in values if row[0] not in seen), key=lambda row: row[0])
+            seen.update(row[0] for row in new_rows)
+            self.write_rows(table, new_rows)
+
+        for link_table, values in games_data["links"].items():
+            self.write_rows(link_table, sorted(values))
+
+    def export_pages(self, extracted_pages):
+        """Passes the (page, games_data) pairs through and exports each of them"""
+        for page, games_data in extracted_pages:
+            self.write_page(games_data)
+            yield page, games_data
+
+    def close(self):
+        for table in list(self.parquet_buffers):
+            self.flush_parquet(table)
+        for writer in self.parquet_writers.values():
+            writer.close()
+        for f in self.csv_files.values():
+            f.close()
+        self.parquet_writers.clear()
+        self.csv_files.clear()
+        self.csv_writers.clear()
+        print(f"Export written to {self.export_path}")
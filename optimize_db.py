@@ -0,0 +1,139 @@
+import config
+import db.db_helpers as helpers
+import db.general_db_search as db_search
+import db.indexes as indexes
+import db.schema as schema
+import sqlite3
+import time
+from datetime import datetime
+
+def get_file_size():
+    # the WAL file belongs to the DB until it is checkpointed
+    return sum(path.stat().st_size for path in config.DB_PATH.parent.glob(f"{config.DB_PATH.name}*") if path.is_file())
+
+def report_queries(conn):
+    """A few typical plot queries; the reference values are taken from the DB itself"""
+    genre = conn.execute("SELECT name FROM genres ORDER BY id LIMIT 1").fetchone()
+    keyword = conn.execute("SELECT name FROM keywords ORDER BY id LIMIT 1").fetchone()
+    queries = {
+        "top rated with platforms": dict(
+            fields=["games.name", "games.total_rating", "platforms.name"],
+            sort_fields=[{"field": "games.total_rating", "direction": "DESC"}],
+            limit=100,
+        ),
+        "release date range": dict(
+            fields=["games.name", "games.first_release_date"],
+            filters=[{"field": "games.first_release_date", "op": "BETWEEN",
+                      "value": [datetime(2015, 1, 1), datetime(2019, 12, 31)]}],
+        ),
+    }
+    if genre:
+        queries["genre filter"] = dict(
+            fields=["games.name", "games.rating"],
+            filters=[{"field": "genres.name", "op": "=", "value": genre[0]}],
+        )
+    if keyword:
+        queries["keyword filter"] = dict(
+            fields=["games.name"],
+            filters=[{"field": "keywords.name", "op": "=", "value": keyword[0]}],
+        )
+    return queries
+
+def time_queries(queries, repeat=3):
+    conn = helpers.get_connection()
+    timings = {}
+    for label, spec in queries.items():
+        best = None
+        for _ in range(repeat):
+            # get_data converts datetime filter values in place
+            args = {key: [dict(f) for f in value] if key == "filters" else value for key, value in spec.items()}
+            start = time.perf_counter()
+            db_search.get_data(conn, cache=False, **args)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        timings[label] = best
+    conn.close()
+    return timings
+
+def is_without_rowid(cursor, table):
+    sql = cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()[0]
+    return "WITHOUT ROWID" in sql.upper()
+
+def rewrite_link_table(cursor, table, strict):
+    """
+    Rebuilds games_<table> as WITHOUT ROWID table clustered by (game_id, <table>_id):
+    the primary key is the table itself, the separate rowid b-tree plus key index
+    of the rowid version disappears.
+    """
+    link_table = f"games_{table}"
+    cursor.execute(f"DROP TABLE IF EXISTS {link_table}_new")
+    cursor.execute(f"""
+    CREATE TABLE {link_table}_new (
+        game_id INTEGER NOT NULL,
+        {table}_id INTEGER NOT NULL,
+        PRIMARY KEY (game_id, {table}_id),
+        FOREIGN KEY (game_id) REFERENCES games(id),
+        FOREIGN KEY ({table}_id) REFERENCES {table}(id)
+    ) WITHOUT ROWID{", STRICT" if strict else ""}
+    """)
+    cursor.execute(f"""
+    INSERT OR IGNORE INTO {link_table}_new (game_id, {table}_id)
+    SELECT game_id, {table}_id FROM {link_table}
+    WHERE game_id IS NOT NULL AND {table}_id IS NOT NULL
+    ORDER BY game_id, {table}_id
+    """)
+    cursor.execute(f"DROP TABLE {link_table}")
+    cursor.execute(f"ALTER TABLE {link_table}_new RENAME TO {link_table}")
+
+def optimize_database(page_size=None):
+    page_size = page_size or config.SQLITE_PAGE_SIZE
+    mapping = helpers.load_mapping(config.DB_MAPPING_PATH)
+    # STRICT tables need SQLite 3.37
+    strict = sqlite3.sqlite_version_info >= (3, 37, 0)
+
+    conn = helpers.get_connection(False)
+    cursor = conn.cursor()
+    cursor.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    queries = report_queries(conn)
+    size_before = get_file_size()
+    page_size_before = cursor.execute("PRAGMA page_size").fetchone()[0]
+    conn.commit()
+    timings_before = time_queries(queries)
+
+    # --- LINK TABLES ---
+    for table in schema.get_ref_tables(mapping):
+        if not is_without_rowid(cursor, f"games_{table}"):
+            print(f"Rewriting games_{table} as WITHOUT ROWID table")
+            rewrite_link_table(cursor, table, strict)
+    # the reverse indexes were dropped with the old tables
+    indexes.create_indexes(cursor)
+    conn.commit()
+
+    # --- PAGE SIZE + VACUUM ---
+    # page_size only changes with VACUUM outside of WAL mode
+    cursor.execute("PRAGMA journal_mode = DELETE")
+    cursor.execute(f"PRAGMA page_size = {page_size}")
+    print("VACUUM ...")
+    cursor.execute("VACUUM")
+    cursor.execute("PRAGMA journal_mode = WAL")
+
+    # --- STATISTICS ---
+    cursor.execute("ANALYZE")
+    cursor.execute("PRAGMA optimize")
+    helpers.close_connection(conn)
+
+    size_after = get_file_size()
+    timings_after = time_queries(queries)
+
+    print(f"Page size: {page_size_before} -> {page_size} bytes")
+    print(f"File size: {size_before / 1e6:.1f} MB -> {size_after / 1e6:.1f} MB ({(size_after - size_before) / size_before:+.0%})")
+    for label in queries:
+        before, after = timings_before[label], timings_after[label]
+        print(f"{label:28} {before * 1000:8.1f}ms -> {after * 1000:8.1f}ms")
+
+if __name__ == "__main__":
+    if not config.DB_PATH.exists():
+        print("No database found, run setup_db.py first")
+    else:
+        print("Close the app before optimizing, the DB is rewritten")
+        optimize_database()
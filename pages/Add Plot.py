@@ -2,6 +2,7 @@ import streamlit as st
 import json
 import time
 import config
+import db.catalog as catalog
 from typing import Optional, List, Dict, Any
 
 def validate_config(plot_config: Dict[str, Any], query_config: Dict[str, Any]) -> List[str]:
@@ -42,9 +43,9 @@ def clean_config(config: Dict[str, Any]) -> Dict[str, Any]:
     """Remove empty/None values from config"""
     return {k: v for k, v in config.items() if v not in (None, "", [], {}, 0, False)}
 
-def translate_webname(select_box: str, whitelist: Dict[str, Any]) -> Optional[str]:
-    """Translate webname to field name using whitelist"""
-    return next((k for k, v in whitelist.items() if v.get("webname") == select_box), None)
+def translate_webname(select_box: str) -> Optional[str]:
+    """Translate webname to field name using the catalog"""
+    return catalog.get_catalog()["webnames"].get(select_box)
 
 def render_filter_selector(whitelist: Dict[str, Any]) -> None:
     """Render filter selector UI components"""
@@ -58,7 +59,7 @@ def render_filter_selector(whitelist: Dict[str, Any]) -> None:
     if field_webname == "---Select field---":
         return
         
-    field = translate_webname(field_webname, whitelist)
+    field = translate_webname(field_webname)
     field_info = whitelist[field]
     
     # Operator selection
@@ -127,7 +128,7 @@ def render_sort_selector(whitelist: Dict[str, Any]) -> None:
                 st.session_state.sort_fields = []
                 
             st.session_state.sort_fields.append({
-                "field": translate_webname(field_webname, whitelist),
+                "field": translate_webname(field_webname),
                 "direction": direction
             })
             st.rerun()
@@ -166,7 +167,7 @@ def render_aggregation_selector(whitelist: Dict[str, Any]) -> None:
         if "aggregations" not in st.session_state:
             st.session_state.aggregations = {}
 
-        field = translate_webname(field_webname, whitelist)
+        field = translate_webname(field_webname)
         # Automatically generate alias
         agg_alias = f"{func}_{field.split('.')[-1]}"
 
@@ -262,8 +263,7 @@ def show():
     with open(config.CHART_TYPES_PATH, "r", encoding="utf-8") as f:
         chart_types = json.load(f)["plots"]
     
-    with open(config.QUERY_WHITELIST_PATH, "r", encoding="utf-8") as f:
-        whitelist = json.load(f)
+    whitelist = catalog.get_catalog()["whitelist"]
     
     # UI Layout
     st.title("Add New Plot")
@@ -324,7 +324,7 @@ def show():
                             st.session_state[field_key] = f"agg:{field_webname[4:]}"
                         else:
                             # Handle normal field selection
-                            st.session_state[field_key] = translate_webname(field_webname, whitelist)
+                            st.session_state[field_key] = translate_webname(field_webname)
         
         # Query configuration
         with st.expander("Query Configuration"):
@@ -337,14 +337,14 @@ def show():
             )
             
             # Store the translated fields in query_fields
-            st.session_state.query_fields = [translate_webname(f, whitelist) for f in selected_fields]
+            st.session_state.query_fields = [translate_webname(f) for f in selected_fields]
 
             group_by_fields = st.multiselect(
                 "Group by fields",
                 options=[v["webname"] for v in whitelist.values()],
                 key="query_group_by_fields"
             )
-            st.session_state.query_group_by = [translate_webname(f, whitelist) for f in group_by_fields]
+            st.session_state.query_group_by = [translate_webname(f) for f in group_by_fields]
             
             # Query options
             render_filter_selector(whitelist)
@@ -1,8 +1,161 @@
 import config
 import api.fetch_filtered_game_data as data
+import api.http_client as http
+import api.raw_cache as raw_cache
+import api.local_filter as local_filter
 import db.db_helpers as helpers
 import db.schema as schema
 import db.insert_data as insert
+import db.indexes as indexes
+import db.fulltext as fulltext
+import db.aggregates as aggregates
+import db.migrate as migrate
+from export.stream_export import StreamExporter
+import time
+
+def iter_pages(query, after_id=0, cache=False, filtered=True):
+    # pages are fetched lazily, a few pages ahead of the DB writes
+    if config.IGDB_CONCURRENT_FETCH:
+        pages = data.iter_game_pages_concurrent(query, after_id)
+    else:
+        pages = data.iter_game_pages(query, after_id)
+    if cache:
+        pages = raw_cache.cache_pages(query, pages, after_id)
+    if filtered:
+        pages = apply_local_filter(pages)
+    return data.prefetch_pages(pages)
+
+def apply_local_filter(pages):
+    # the raw cache keeps the unfiltered superset, filters are applied afterwards
+    if config.IGDB_FILTER_LOCALLY:
+        return local_filter.filter_pages(pages)
+    return pages
+
+def extract_cached_pages(query, mapping):
+    # replays are CPU-bound, so the workers decode, filter and extract the cache files in parallel
+    if config.EXTRACT_WORKERS > 1:
+        make_filter = local_filter.compile_game_filter if config.IGDB_FILTER_LOCALLY else None
+        return insert.extract_pages_parallel(raw_cache.list_cached_files(query), mapping,
+                                             read_page=raw_cache.read_page, make_filter=make_filter)
+    return insert.extract_pages(apply_local_filter(raw_cache.iter_cached_pages(query)), mapping)
+
+def create_schema(cursor, mapping, deferred_keys=False):
+    # create games-table
+    schema.create_games_table(cursor)
+    schema.create_meta_table(cursor)
+
+    # Create reference and many-to-many tables, if required
+    for table in schema.get_ref_tables(mapping):
+        schema.create_reference_and_m2m_tables(cursor, table, deferred_key=deferred_keys)
+
+def refresh_derived_tables(cursor):
+    # full-text index and summary tables are derived from games and the link tables,
+    # the new generation invalidates the query results the app has cached
+    fulltext.rebuild_fts(cursor)
+    aggregates.refresh_aggregates(cursor)
+    helpers.bump_generation(cursor)
+
+def build_database(extracted_pages, mapping, on_commit=None, resume=False, refresh=False, import_started=None):
+    """
+    Creates games.sqlite from the extracted pages. With refresh=True the pages are
+    upserted into the existing DB, only changed games and relations are rewritten.
+    import_started is the time the pages were fetched (default: now), the first sync
+    asks IGDB for the games updated since then.
+    """
+    # bulk mode only for a new DB, a refresh writes into the user's existing one
+    bulk = config.BULK_LOAD and not refresh
+    conn = helpers.get_connection(False, bulk=bulk)
+    cursor = conn.cursor()
+
+    # --- SCHEMA ---
+    # in bulk mode the link-table keys are indexed after the load
+    create_schema(cursor, mapping, deferred_keys=bulk)
+    if not resume:
+        # games changed on IGDB while the import runs are picked up by the first sync
+        helpers.set_meta(cursor, "import_started", import_started or int(time.time()))
+    if not helpers.get_meta(cursor, "schema_version"):
+        migrate.record_schema(cursor, mapping)
+    conn.commit()
+
+    # --- INSERTS ---
+    insert.ingest_pages(conn, extracted_pages, on_commit=on_commit,
+                        commit_every=config.BULK_COMMIT_PAGES if bulk else 1,
+                        mapping=mapping if refresh else None)
+
+    # --- INDEXES ---
+    for table in schema.get_ref_tables(mapping):
+        schema.create_link_key_index(cursor, table)
+    indexes.create_indexes(cursor)
+    refresh_derived_tables(cursor)
+    cursor.execute("ANALYZE")
+    helpers.set_meta(cursor, "last_sync", helpers.get_meta(cursor, "import_started", 0))
+
+    #config.QUERY_WHITELIST_PATH.unlink()
+    #helpers.generate_whitelist_from_mapping(config.DB_MAPPING_PATH, config.QUERY_WHITELIST_PATH)
+    config.PRESET_PATH.mkdir(exist_ok=True)
+
+    print("Setup finished")
+    helpers.close_connection(conn)
+
+def sync_database(query, mapping):
+    """Fetches only games updated since the last sync and upserts the changed ones"""
+    conn = helpers.get_connection(False)
+    cursor = conn.cursor()
+    create_schema(cursor, mapping)
+    # DBs built before the mapping declared indexes get them here
+    if indexes.create_indexes(cursor):
+        cursor.execute("ANALYZE")
+
+    since = int(helpers.get_meta(cursor, "last_sync", 0))
+    if not since:
+        print("No previous sync found, all games are compared")
+
+    sync_started = int(time.time())
+    changed = insert.sync_pages(conn, iter_pages(data.build_sync_query(query, since)), mapping)
+
+    if changed or not fulltext.has_fts(cursor) or not aggregates.has_aggregates(cursor):
+        refresh_derived_tables(cursor)
+    helpers.set_meta(cursor, "last_sync", sync_started)
+    print(f"Sync finished, {changed} games updated")
+    print("HTTP:", http.format_stats())
+    helpers.close_connection(conn)
+
+def migrate_database(query, mapping):
+    """
+    Adds the columns and relation tables of new mapping entries to an existing DB and
+    backfills only those fields: from the raw cache if a cached import contains them,
+    otherwise by fetching just these fields from IGDB.
+    """
+    conn = helpers.get_connection(False)
+    cursor = conn.cursor()
+    schema.create_meta_table(cursor)
+
+    new_entries = migrate.diff_schema(cursor, mapping)
+    if not new_entries:
+        print("Schema matches the mapping")
+        helpers.close_connection(conn)
+        return
+
+    print("New mapping fields:", ", ".join(sorted({api_field for api_field, _, _ in new_entries})))
+    migrate.apply_schema_changes(cursor, new_entries)
+    conn.commit()
+
+    fields = data.get_game_fields(new_entries)
+    cached_query = raw_cache.find_cached_query(query["where"], fields)
+    if cached_query:
+        pages = raw_cache.iter_cached_pages(cached_query)
+    else:
+        # id + the new fields only, the where clause selects the same games as the import
+        pages = iter_pages({"fields": f"id, {fields}", "where": query["where"]}, filtered=False)
+    updated = migrate.backfill_pages(conn, pages, new_entries)
+
+    indexes.create_indexes(cursor)
+    refresh_derived_tables(cursor)
+    cursor.execute("ANALYZE")
+    version = migrate.record_schema(cursor, mapping)
+    print(f"Schema version {version}: {updated} games backfilled")
+    print("New fields need an entry in db_query_whitelist.json to be usable in plots")
+    helpers.close_connection(conn)
 
 if __name__ == "__main__":
     while True:
@@ -12,63 +165,94 @@ if __name__ == "__main__":
         else:
             print("Invalid Input, try again")
 
+    mapping = helpers.load_mapping(config.DB_MAPPING_PATH)
+    query = data.build_game_query(mapping)
+    resume_id = 0
+    refresh = False
+
     while True:
-        input_sqlite = input("should an SQLite database be created? (y/n): ")
-        if input_sqlite in ["y", "n", "debug_trotzdem"]:
-            if input_sqlite in ["y", "debug_trotzdem"] and not config.DB_PATH.exists():
+        input_sqlite = input("should an SQLite database be created? "
+                             "(y/n, 'sync' updates an existing one, 'migrate' adds new mapping fields to it, "
+                             "'replay' rebuilds it from the raw cache): ")
+        if input_sqlite in ["y", "n", "sync", "migrate", "replay", "debug_trotzdem"]:
+            if input_sqlite in ["sync", "migrate"]:
+                if config.DB_PATH.exists():
+                    break
+                print(f"No database to {input_sqlite} yet, create one with 'y'")
+            elif input_sqlite == "replay":
+                if raw_cache.has_cache(query):
+                    break
+                print("No complete raw cache for the current query, run a normal import first")
+            elif input_sqlite in ["y", "debug_trotzdem"] and not config.DB_PATH.exists():
+                # WAL files left over from a deleted DB
+                helpers.delete_database()
+                data.clear_checkpoint()
                 break
             elif input_sqlite == "debug_trotzdem":
-                config.DB_PATH.unlink()
+                helpers.delete_database()
+                data.clear_checkpoint()
                 break
             elif input_sqlite == "n":
                 break
+            elif data.load_checkpoint(query):
+                # an interrupted import continues after the last committed game
+                resume_id = data.load_checkpoint(query)
+                print(f"Unfinished import found, resuming after game id {resume_id}")
+                break
             else:
-                print("Database already exists. SQLite setup canceled.")
-                input_sqlite = "n"
+                # re-import over the existing DB, changed games are upserted
+                print("Database already exists, refreshing it in place")
+                refresh = True
                 break
-        else:         
+        else:
             print("Invalid Input, try again")
 
-    if input_csv == "n" and input_sqlite == "n":
+    # an existing DB gets new mapping fields before it is written to
+    if input_sqlite in ["sync", "migrate"] or refresh:
+        migrate_database(query, mapping)
+
+    if input_sqlite == "sync":
+        sync_database(query, mapping)
+    elif input_sqlite == "migrate":
+        print("HTTP:", http.format_stats())
+    elif input_csv == "n" and input_sqlite == "n":
         print("Setup canceled")
     else:
-        all_game_data = data.fetch_game_data()
-            
-        if input_csv == "y":
-            pass
-
-        if input_sqlite in ["y", "debug_trotzdem"]: 
-            conn = helpers.get_connection(False)
-            cursor = conn.cursor()
-
-            # --- SCHEMA ---
-            # create games-table
-            schema.create_games_table(cursor)
-
-            # Create reference and many-to-many tables, if required
-            mapping = helpers.load_mapping(config.DB_MAPPING_PATH) 
-            seen_refs = set()
-
-            for _, table, _ in mapping:
-                if table != "games" and table not in seen_refs:
-                    schema.create_reference_and_m2m_tables(cursor, table)
-                    seen_refs.add(table)
-
-            # --- INSERTS ---
-            game_inserts, ref_inserts, link_inserts = insert.extract_insert_data(all_game_data, mapping)
-
-            games_data = {
-                "games": game_inserts,
-                "refs": ref_inserts,
-                "links": link_inserts
-            }
-
-            insert.insert_game_batches(cursor, games_data)
+        if input_sqlite == "replay":
+            # no network: the DB is rebuilt from the pages of the last import
+            helpers.delete_database()
+            import_started = raw_cache.get_fetch_started(query)
+            extracted_pages = extract_cached_pages(query, mapping)
+        else:
+            if config.RAW_CACHE_ENABLED and not resume_id:
+                raw_cache.clear_cache(query)
+            import_started = None
+            pages = iter_pages(query, resume_id, cache=config.RAW_CACHE_ENABLED)
+            extracted_pages = insert.extract_pages(pages, mapping)
 
-            #config.QUERY_WHITELIST_PATH.unlink()
-            #helpers.generate_whitelist_from_mapping(config.DB_MAPPING_PATH, config.QUERY_WHITELIST_PATH)
-            config.PRESET_PATH.mkdir(exist_ok=True)
+        exporter = None
+        if input_csv == "y":
+            if resume_id:
+                print(f"Note: the export only contains games after id {resume_id}")
+            # written while the pages arrive, no second pass over the data
+            exporter = StreamExporter()
+            extracted_pages = exporter.export_pages(extracted_pages)
 
+        if input_sqlite in ["y", "replay", "debug_trotzdem"]:
+            on_commit = None
+            # an interrupted refresh is simply run again, unchanged games are skipped quickly
+            if input_sqlite != "replay" and not refresh:
+                on_commit = lambda page: data.save_checkpoint(query, page[-1]["id"])
+            build_database(extracted_pages, mapping, on_commit=on_commit,
+                           resume=bool(resume_id), refresh=refresh, import_started=import_started)
+            # a replay doesn't consume the checkpoint of an interrupted import
+            if input_sqlite != "replay":
+                data.clear_checkpoint()
+        else:
+            for _ in extracted_pages:
+                pass
 
-            print("Setup finished")
-            helpers.close_connection(conn)
\ No newline at end of file
+        if exporter:
+            exporter.close()
+        if input_sqlite != "replay":
+            print("HTTP:", http.format_stats())
@@ -1,7 +1,5 @@
-import config
 import plotly.express as px
 import plotly.graph_objects as go
-import json
 import pandas as pd
 import numpy as np
 from statsmodels.nonparametric.smoothers_lowess import lowess
@@ -46,21 +44,8 @@ class Chart:
     def get_dataframe(self, get_data) -> pd.DataFrame:
         """Execute query and return processed DataFrame"""
         args = self.get_query_args()
-        df = get_data(**args)
-
-        with open(config.QUERY_WHITELIST_PATH, "r", encoding="utf-8") as f:
-            whitelist = json.load(f)
-
-        # Handle datetime conversion
-        for col in df.columns:
-            whitelist_key = col
-            if whitelist_key not in whitelist and f"games.{col}" in whitelist:
-                whitelist_key = f"games.{col}"
-
-            if whitelist_key in whitelist and whitelist[whitelist_key]["type"] == "datetime":
-                df[col] = pd.to_datetime(df[col], unit='s')
-
-        return df
+        # get_data returns typed columns (datetime64, Int64, categoricals)
+        return get_data(**args)
     
     def render(self, get_data_func) -> go.Figure:
         """Render the chart (to be implemented by subclasses)"""